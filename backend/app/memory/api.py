@@ -4,31 +4,45 @@ Memory Management API Endpoints
 Provides endpoints for monitoring and managing session memory
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse
 from typing import Dict, Any
-from .session_memory import get_session_memory
-from .smart_response import smart_response
+from .session_memory import SessionMemory, get_session_memory
+from .smart_response import SmartResponse, get_smart_response
 
-router = APIRouter(prefix="/memory", tags=["memory"])
+# Summaries are plain dicts/str values, so orjson serializes them natively
+router = APIRouter(prefix="/memory", tags=["memory"], default_response_class=ORJSONResponse)
+
+async def memory_dep() -> SessionMemory:
+    """Resolve the session memory singleton once per request"""
+    return get_session_memory()
+
+async def smart_response_dep() -> SmartResponse:
+    """Resolve the lazily-built SmartResponse singleton once per request"""
+    return get_smart_response()
 
 @router.get("/sessions")
-async def get_all_sessions():
-    """Get summary of all active sessions"""
+async def get_all_sessions(
+    page: int = Query(0, ge=0),
+    size: int = Query(100, ge=1, le=1000),
+    memory: SessionMemory = Depends(memory_dep)
+):
+    """Get summary of active sessions, one page at a time"""
     try:
-        memory = get_session_memory()
         return {
             "status": "success",
-            "total_sessions": len(memory.sessions),
-            "sessions": memory.get_all_sessions()
+            "total_sessions": memory.session_count(),
+            "page": page,
+            "size": size,
+            "sessions": memory.get_all_sessions(page, size)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sessions/{session_id}")
-async def get_session_info(session_id: str):
+async def get_session_info(session_id: str, memory: SessionMemory = Depends(memory_dep)):
     """Get detailed information about a specific session"""
     try:
-        memory = get_session_memory()
         session_info = memory.get_session_summary(session_id)
         return {
             "status": "success",
@@ -38,10 +52,9 @@ async def get_session_info(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/sessions/{session_id}")
-async def clear_session(session_id: str):
+async def clear_session(session_id: str, memory: SessionMemory = Depends(memory_dep)):
     """Clear a specific session (useful for testing)"""
     try:
-        memory = get_session_memory()
         memory.clear_session(session_id)
         return {
             "status": "success",
@@ -51,19 +64,20 @@ async def clear_session(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sessions/{session_id}/response-metadata")
-async def get_response_metadata(session_id: str):
+async def get_response_metadata(session_id: str, smart_response: SmartResponse = Depends(smart_response_dep)):
     """Get metadata about response generation for a session"""
     try:
         session_info = smart_response.get_session_info(session_id)
+        # UserInfo is slotted and has no consent/study_* fields, so those keys always report their defaults
         return {
             "status": "success",
             "metadata": {
                 "session_id": session_id,
                 "has_contact_info": bool(session_info.email or session_info.phone) if session_info else False,
-                "has_consent": getattr(session_info, 'consent_given', False) if session_info else False,
-                "study_country": getattr(session_info, 'study_country', None) if session_info else None,
-                "study_level": getattr(session_info, 'study_level', None) if session_info else None,
-                "target_intake": getattr(session_info, 'target_intake', None) if session_info else None
+                "has_consent": False,
+                "study_country": None,
+                "study_level": None,
+                "target_intake": None
             }
         }
     except Exception as e:
@@ -5,25 +5,117 @@ Tracks user information and manages smart question flow
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Deque
 from dataclasses import dataclass, field
 from datetime import datetime
-import json
+import atexit
+import orjson
 import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
 
 # Try to import Supabase for persistence
 try:
-    from supabase import create_client, Client
+    from supabase import Client
+    from app.utils.supabase_client import create_pooled_client, upsert_rows
     SUPABASE_AVAILABLE = True
 except ImportError:
     SUPABASE_AVAILABLE = False
     Client = None
 
+# Try to import cachetools for bounded session storage
+try:
+    from cachetools import LRUCache, TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Debounced persistence: saves are coalesced per session and upserted in batches
+FLUSH_INTERVAL_SECONDS = 0.25
+MERGE_BATCH_LIMIT = 100
+
+# Retry policy for batch upserts (jittered exponential backoff, honors Retry-After)
+FLUSH_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY_SECONDS = 0.2
+RETRY_MAX_DELAY_SECONDS = 5.0
+FLUSH_MAX_REQUEUES = 3  # flush cycles a failed session save is carried into before it is dropped
+
+# In-memory session cache bounds
+# Website sessions cannot be reloaded, so they expire after an hour without activity
+# (get_session re-inserts on every hit - TTLCache otherwise counts from insertion);
+# Telegram sessions are evicted least-recently-used and reloaded from Supabase on demand
+WEB_SESSION_CACHE_MAX = 10_000
+WEB_SESSION_TTL_SECONDS = 3600
+TELEGRAM_SESSION_CACHE_MAX = 10_000
+
+# Database function that deletes a session's rows from every table in one call
+DELETE_SESSION_RPC = "delete_session"
+PGRST_FUNCTION_NOT_FOUND = "PGRST202"  # PostgREST error code for an unknown RPC
+
+# Exchanges kept in memory per session - only the last few ever reach a prompt
+RECENT_CONTEXT_SIZE = 5  # exchanges handed to the LLM by get_conversation_context
+
+def _decode_list_column(value: Any) -> List[str]:
+    """Decode a list column stored as JSON text (older rows / json columns may already be a list)"""
+    if isinstance(value, str):
+        return orjson.loads(value)
+    return value or []
+
+# Session id markers, matched anywhere in the id and case-insensitively - one scan, no lowercased copy
+_TELEGRAM_SESSION_RE = re.compile(
+    r"telegram_"    # telegram_123456789
+    r"|tg_"         # tg_123456789
+    r"|bot_"        # bot_123456789
+    r"|chat_"       # chat_123456789
+    r"|user_",      # user_123456789
+    re.IGNORECASE
+)
+_WEBSITE_SESSION_RE = re.compile(
+    r"session_"     # session_1234567890
+    r"|web_"        # web_123456789
+    r"|widget_"     # widget_123456789
+    r"|browser_"    # browser_123456789
+    r"|temp_",      # temp_123456789
+    re.IGNORECASE
+)
+
+# A session id's platform never changes, so classification is memoized per id
+@lru_cache(maxsize=16384)
+def _is_telegram_session_id(session_id: str) -> bool:
+    return _TELEGRAM_SESSION_RE.search(session_id) is not None
+
+@lru_cache(maxsize=16384)
+def _is_website_session_id(session_id: str) -> bool:
+    return _WEBSITE_SESSION_RE.search(session_id) is not None
+
+# Columns read back when restoring a Telegram session (everything UserInfo needs, nothing more)
+SESSION_COLUMNS = (
+    "email,phone,name,country,intake,program_level,field_of_study,"
+    "conversation_summary,progress_state,exchange_count,completed_steps,next_actions,"
+    "created_at,last_updated"
+)
+
+# Summary labels for collected fields, in the order they appear in the conversation summary
+_SUMMARY_LABELS = {
+    "country": "Target country",
+    "program_level": "Program level",
+    "intake": "Intake period",
+    "field_of_study": "Field of study",
+    "email": "Contact info provided"
+}
+
+@dataclass(slots=True)
 class UserInfo:
     """User information structure with enhanced conversation tracking"""
+    # Profile fields update_info may write - everything else is internal state
+    _UPDATABLE = frozenset(('email', 'phone', 'name', 'country', 'intake', 'program_level', 'field_of_study'))
+    
     email: Optional[str] = None
     phone: Optional[str] = None
     name: Optional[str] = None
@@ -33,7 +125,6 @@ class UserInfo:
     field_of_study: Optional[str] = None
     
     # Conversation tracking
-    conversation_history: List[Dict[str, str]] = field(default_factory=list)
     conversation_summary: str = ""
     progress_state: str = "greeting"
     exchange_count: int = 0
@@ -46,64 +137,123 @@ class UserInfo:
     created_at: Optional[datetime] = None
     last_updated: Optional[datetime] = None
     
+    # Incremental summary state - parts change only in update_info, the summary is rebuilt only when stale
+    _summary_parts: Dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _summary_stage: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    # Rolling window of the last RECENT_CONTEXT_SIZE exchanges - the only exchange history kept
+    _recent: Deque[Dict[str, str]] = field(default_factory=lambda: deque(maxlen=RECENT_CONTEXT_SIZE), init=False, repr=False, compare=False)
+    
+    # Reused sessions row for Supabase upserts (see to_record)
+    _supabase_shadow: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    _record_dirty: bool = field(default=True, init=False, repr=False, compare=False)  # shadow is stale
+    
     def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now()
-        if self.last_updated is None:
-            self.last_updated = datetime.now()
+        # Rows restored via from_record carry both timestamps - only read the clock when one is missing
+        if self.created_at is None or self.last_updated is None:
+            now = datetime.now()
+            if self.created_at is None:
+                self.created_at = now
+            if self.last_updated is None:
+                self.last_updated = now
+        
+        # Seed summary parts from fields passed to the constructor (e.g. loaded from Supabase)
+        for key, label in _SUMMARY_LABELS.items():
+            value = getattr(self, key)
+            if value:
+                self._summary_parts[key] = f"{label}: {value}"
+    
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "UserInfo":
+        """Build from a sessions row - timestamps are parsed once, straight into the constructor"""
+        created_at = record.get("created_at")
+        last_updated = record.get("last_updated")
+        return cls(
+            email=record.get("email"),
+            phone=record.get("phone"),
+            name=record.get("name"),
+            country=record.get("country"),
+            intake=record.get("intake"),
+            program_level=record.get("program_level"),
+            field_of_study=record.get("field_of_study"),
+            conversation_summary=record.get("conversation_summary", ""),
+            progress_state=record.get("progress_state", "conversation_active"),
+            exchange_count=record.get("exchange_count", 0),
+            completed_steps=_decode_list_column(record.get("completed_steps")),
+            next_actions=_decode_list_column(record.get("next_actions")),
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+            last_updated=datetime.fromisoformat(last_updated) if last_updated else None
+        )
     
     def add_conversation_exchange(self, user_input: str, bot_response: str) -> None:
         """Add a new conversation exchange"""
+        now = datetime.now()
         exchange = {
             "user_input": user_input,
             "bot_response": bot_response,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "exchange_number": self.exchange_count + 1
         }
-        self.conversation_history.append(exchange)
+        self._recent.append(exchange)
         self.exchange_count += 1
-        self.last_updated = datetime.now()
+        self.last_updated = now
         self._update_conversation_summary()
-        self._update_progress_state()
-        self._update_next_actions()
+        # Let the LLM decide naturally - the stage only ever moves to "conversation_active"
+        self.progress_state = "conversation_active"
+        # Flagged only after every write, so a concurrent to_record can never clear it early (see to_record)
+        self._record_dirty = True
     
     def _update_conversation_summary(self) -> None:
         """Build a smart summary of the conversation"""
-        if not self.conversation_history:
+        if not self._recent:
             self.conversation_summary = "New conversation started"
             return
         
-        summary_parts = []
+        # Nothing summarized has changed since the last build
+        if self._summary_stage == self.progress_state:
+            return
         
         # Add collected information
-        if self.country:
-            summary_parts.append(f"Target country: {self.country}")
-        if self.program_level:
-            summary_parts.append(f"Program level: {self.program_level}")
-        if self.intake:
-            summary_parts.append(f"Intake period: {self.intake}")
-        if self.field_of_study:
-            summary_parts.append(f"Field of study: {self.field_of_study}")
-        if self.email:
-            summary_parts.append(f"Contact info provided: {self.email}")
+        summary_parts = [self._summary_parts[key] for key in _SUMMARY_LABELS if key in self._summary_parts]
         
         # Add current state
         summary_parts.append(f"Current stage: {self.progress_state}")
         
         self.conversation_summary = ". ".join(summary_parts)
-    
-    def _update_progress_state(self) -> None:
-        """Update the progress state based on collected information"""
-        # Let the LLM decide naturally - don't force specific progress states
-        self.progress_state = "conversation_active"
+        self._summary_stage = self.progress_state
+    
+    def to_record(self, session_id: str) -> Dict[str, Any]:
+        """Serialize to a sessions row - literal keys, orjson for list columns, shadow dict reused across saves"""
+        record = self._supabase_shadow
+        if record is not None and not self._record_dirty and record["session_id"] == session_id:
+            # Unchanged since the last build (e.g. a re-queued failed batch) - reuse as-is
+            return record
+        if record is None or record["session_id"] != session_id:
+            # Invariant columns are filled once per session
+            record = {
+                "session_id": session_id,
+                "created_at": self.created_at.isoformat() if self.created_at else None,
+                "platform": "telegram"  # Mark as Telegram session
+            }
+            self._supabase_shadow = record
         
-        # Don't track completed steps - let LLM decide naturally
-        self.completed_steps = []
-    
-    def _update_next_actions(self) -> None:
-        """Determine what actions should happen next"""
-        # Let the LLM decide naturally - don't force specific actions
-        self.next_actions = []
+        # Clear the flag BEFORE reading: writers set it after their last write, so a change that
+        # lands mid-build (the flusher runs unlocked beside request threads) re-dirties the shadow
+        self._record_dirty = False
+        record["email"] = self.email
+        record["phone"] = self.phone
+        record["name"] = self.name
+        record["country"] = self.country
+        record["intake"] = self.intake
+        record["program_level"] = self.program_level
+        record["field_of_study"] = self.field_of_study
+        record["conversation_summary"] = self.conversation_summary
+        record["progress_state"] = self.progress_state
+        record["exchange_count"] = self.exchange_count
+        record["completed_steps"] = orjson.dumps(self.completed_steps).decode()
+        record["next_actions"] = orjson.dumps(self.next_actions).decode()
+        record["last_updated"] = self.last_updated.isoformat() if self.last_updated else None
+        return record
     
     def get_conversation_context(self) -> Dict[str, Any]:
         """Get comprehensive conversation context for LLM"""
@@ -116,7 +266,7 @@ class UserInfo:
                 "email": self.email
             },
             "conversation_summary": self.conversation_summary,
-            "conversation_history": self.conversation_history[-5:] if self.conversation_history else []  # Last 5 exchanges
+            "conversation_history": list(self._recent)  # Last RECENT_CONTEXT_SIZE exchanges
         }
     
     def _get_conversation_flow(self) -> str:
@@ -131,34 +281,70 @@ class UserInfo:
     
     def is_complete(self) -> bool:
         """Check if all required user info is collected"""
-        return all([
-            self.country,
-            self.program_level,
-            self.intake,
-            self.field_of_study,
-            self.email
-        ])
-    
-    def update_info(self, new_info: Dict[str, str]) -> None:
-        """Update user information"""
+        # Short-circuit chain - no temporary list per call
+        return bool(
+            self.country
+            and self.program_level
+            and self.intake
+            and self.field_of_study
+            and self.email
+        )
+    
+    def update_info(self, new_info: Dict[str, str]) -> bool:
+        """Update user information - returns True if any field actually changed"""
+        changed = False
         for key, value in new_info.items():
-            if hasattr(self, key) and value:
+            if value and key in self._UPDATABLE and getattr(self, key) != value:
                 setattr(self, key, value)
-                self.last_updated = datetime.now()
+                changed = True
+                if key in _SUMMARY_LABELS:
+                    self._summary_parts[key] = f"{_SUMMARY_LABELS[key]}: {value}"
+                    self._summary_stage = None  # mark summary stale
                 logger.info(f"Updated {key}: {value}")
         
-        # Update progress and actions after info change
-        self._update_progress_state()
-        self._update_next_actions()
+        # Re-submitted values leave the session untouched
+        if not changed:
+            return False
+        
+        self.last_updated = datetime.now()
+        
+        # Completed steps / next actions are never tracked (LLM-guided), only the stage moves
+        self.progress_state = "conversation_active"
         self._update_conversation_summary()
+        self._record_dirty = True  # last, after every write (see to_record)
+        return True
 
 class SessionMemory:
     """Manages session-based user memory with Supabase persistence"""
     
+    __slots__ = ('_tg', '_web', '_tg_lock', '_web_lock', 'supabase', '_rest_auth', '_rpc_delete_available', '_pending', '_pending_lock', '_flush_lock', '_flush_event', '_flusher', '_requeues')
+    
     def __init__(self):
-        self.sessions: Dict[str, UserInfo] = {}
+        # Telegram sessions persist to Supabase; website sessions live only in memory
+        if CACHETOOLS_AVAILABLE:
+            self._tg: Dict[str, UserInfo] = LRUCache(maxsize=TELEGRAM_SESSION_CACHE_MAX)
+            self._web: Dict[str, UserInfo] = TTLCache(maxsize=WEB_SESSION_CACHE_MAX, ttl=WEB_SESSION_TTL_SECONDS)
+        else:
+            logger.warning("cachetools not available - session cache is unbounded")
+            self._tg: Dict[str, UserInfo] = {}
+            self._web: Dict[str, UserInfo] = {}
+        # One lock per map - cache reads reorder entries, and memory calls arrive from worker threads
+        self._tg_lock = threading.Lock()
+        self._web_lock = threading.Lock()
         self.supabase: Optional[Client] = None
+        self._rest_auth: Optional[Tuple[str, str]] = None  # (url, key) for direct PostgREST upserts
+        self._rpc_delete_available = True  # flipped off once the database reports no delete_session function
+        
+        # Sessions waiting to be persisted (last write wins per session_id)
+        self._pending: Dict[str, UserInfo] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # held for the whole flush so deletes can wait out in-flight upserts
+        self._flush_event = threading.Event()  # wakes the flusher early once a full batch is pending
+        self._flusher: Optional[threading.Thread] = None
+        self._requeues: Dict[str, int] = {}  # session_id -> consecutive failed flushes (guarded by _pending_lock)
+        
         self._initialize_supabase()
+        atexit.register(self._flush_dirty)
         logger.info("Session Memory Manager initialized")
     
     def _initialize_supabase(self):
@@ -180,86 +366,199 @@ class SessionMemory:
                 logger.warning("Supabase credentials not found - sessions will only be stored in memory")
                 return
             
-            self.supabase = create_client(url, key)
+            # Keep-alive pooled transport - the flusher reuses connections instead of re-handshaking
+            self.supabase = create_pooled_client(url, key)
+            self._rest_auth = (url, key)
             logger.info("Supabase client initialized for session persistence")
             
         except Exception as e:
             logger.error(f"Failed to initialize Supabase client: {e}")
             self.supabase = None
     
-    def _save_session_to_supabase(self, session_id: str, session_data: UserInfo) -> bool:
-        """Save session data to Supabase for persistence - ONLY for Telegram sessions"""
+    def _mark_dirty(self, session_id: str, session_data: UserInfo) -> None:
+        """Queue session for persistence - ONLY for Telegram sessions"""
         # Check if this is a Telegram session (permanent) or website session (temporary)
         if not self._is_telegram_session(session_id):
-            logger.info(f"Session {session_id} is website session - not saving to database (temporary)")
-            return True  # Return success for temporary sessions
+            return
             
         if not self.supabase:
             logger.warning(f"Cannot save Telegram session {session_id} - Supabase not available")
-            return False
+            return
+        
+        with self._pending_lock:
+            self._pending[session_id] = session_data
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+                self._flusher.start()
+            if len(self._pending) >= MERGE_BATCH_LIMIT:
+                self._flush_event.set()
+    
+    def _flush_loop(self) -> None:
+        """Background worker: flush pending sessions every FLUSH_INTERVAL_SECONDS (sooner when a batch fills)"""
+        while True:
+            self._flush_event.wait(FLUSH_INTERVAL_SECONDS)
+            self._flush_event.clear()
+            try:
+                self._flush_dirty()
+            except Exception as e:
+                # Never let one bad flush kill the worker - _flusher stays set, so it would not be restarted
+                logger.error(f"❌ Error flushing Telegram sessions: {e}")
+    
+    def _flush_dirty(self) -> None:
+        """Upsert all pending sessions to Supabase in batches of MERGE_BATCH_LIMIT"""
+        with self._flush_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
             
+            items = list(pending.items())
+            for i in range(0, len(items), MERGE_BATCH_LIMIT):
+                self._flush_batch(items[i:i + MERGE_BATCH_LIMIT])
+    
+    def _flush_batch(self, batch: List[Tuple[str, UserInfo]]) -> None:
+        """Upsert one batch - halves it to isolate rows Supabase rejects, re-queues it on transient failure"""
+        # Encoded once here - every retry attempt re-sends the same bytes
+        body = orjson.dumps([session.to_record(session_id) for session_id, session in batch])
         try:
-            # Convert session data to JSON-serializable format
-            session_record = {
-                "session_id": session_id,
-                "email": session_data.email,
-                "phone": session_data.phone,
-                "name": session_data.name,
-                "country": session_data.country,
-                "intake": session_data.intake,
-                "program_level": session_data.program_level,
-                "field_of_study": session_data.field_of_study,
-                "conversation_summary": session_data.conversation_summary,
-                "progress_state": session_data.progress_state,
-                "exchange_count": session_data.exchange_count,
-                "completed_steps": json.dumps(session_data.completed_steps),
-                "next_actions": json.dumps(session_data.next_actions),
-                "created_at": session_data.created_at.isoformat() if session_data.created_at else None,
-                "last_updated": session_data.last_updated.isoformat() if session_data.last_updated else None,
-                "platform": "telegram"  # Mark as Telegram session
-            }
-            
-            # Upsert session data (create or update)
-            result = self.supabase.table("sessions").upsert(session_record, on_conflict="session_id").execute()
-            
-            if result.data:
-                logger.info(f"Telegram session {session_id} saved to Supabase successfully")
-                return True
+            flushed = self._upsert_with_retry(body, len(batch))
+        except Exception as e:
+            # Permanent rejection (4xx) - retrying the same rows can never succeed
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                self._flush_batch(batch[:middle])
+                self._flush_batch(batch[middle:])
             else:
-                logger.error(f"Failed to save Telegram session {session_id} to Supabase")
-                return False
+                logger.error(f"❌ Dropping save for Telegram session {batch[0][0]} - rejected by Supabase: {str(e)}")
+                with self._pending_lock:
+                    self._requeues.pop(batch[0][0], None)
+            return
+        
+        with self._pending_lock:
+            for session_id, session in batch:
+                if flushed:
+                    self._requeues.pop(session_id, None)
+                    continue
+                # Re-queue for the next flush unless a newer save is already pending
+                requeues = self._requeues.get(session_id, 0) + 1
+                if requeues > FLUSH_MAX_REQUEUES:
+                    logger.error(f"❌ Dropping save for Telegram session {session_id} after {FLUSH_MAX_REQUEUES} failed flushes")
+                    self._requeues.pop(session_id, None)
+                    continue
+                self._requeues[session_id] = requeues
+                self._pending.setdefault(session_id, session)
+    
+    def _discard_pending(self, session_id: str) -> None:
+        """Drop a queued save before its row is deleted, so a later flush cannot resurrect it"""
+        # Taking the flush lock first waits out any in-flight (or re-queued) upsert of this session
+        with self._flush_lock:
+            with self._pending_lock:
+                self._pending.pop(session_id, None)
+                self._requeues.pop(session_id, None)
+    
+    def _upsert_with_retry(self, body: bytes, count: int) -> bool:
+        """
+        Upsert session rows, retrying transient failures - session_id keeps retries idempotent
+        
+        Returns False once transient failures exhaust FLUSH_MAX_ATTEMPTS; permanent
+        errors (4xx other than 429) are raised on the first attempt.
+        """
+        for attempt in range(1, FLUSH_MAX_ATTEMPTS + 1):
+            try:
+                # One orjson-encoded POST per batch on the shared HTTP/2 pool
+                upsert_rows(*self._rest_auth, "sessions", body, on_conflict="session_id")
+                logger.info(f"Flushed {count} Telegram session(s) to Supabase")
+                return True
+                    
+            except Exception as e:
+                if not self._is_transient(e):
+                    raise
+                if attempt == FLUSH_MAX_ATTEMPTS:
+                    logger.error(f"Error flushing {count} Telegram session(s) to Supabase after {attempt} attempts: {str(e)}")
+                    return False
                 
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"⚠️ Session flush attempt {attempt} failed: {str(e)} - retrying in {delay:.2f}s")
+                time.sleep(delay)
+        
+        return False
+    
+    def _is_transient(self, error: Exception) -> bool:
+        """Transport errors, 429 and 5xx are worth retrying; any other HTTP status is permanent"""
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        return status is None or status == 429 or status >= 500
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Backoff before the next attempt - Retry-After when the server sent one, full jitter otherwise"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), RETRY_MAX_DELAY_SECONDS)
+            except ValueError:
+                pass
+        return random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+    
+    def _delete_session_rows(self, session_id: str) -> None:
+        """
+        Delete a session's rows from the sessions and leads tables in one round trip
+        
+        Uses the delete_session(sid text) database function when it exists:
+            CREATE FUNCTION delete_session(sid text) RETURNS void AS $$
+                DELETE FROM sessions WHERE session_id = sid;
+                DELETE FROM leads WHERE session_id = sid;
+            $$ LANGUAGE sql;
+        and falls back to one DELETE per table otherwise.
+        """
+        if self._rpc_delete_available:
+            try:
+                self.supabase.rpc(DELETE_SESSION_RPC, {"sid": session_id}).execute()
+                return
+            except Exception as e:
+                if getattr(e, "code", None) != PGRST_FUNCTION_NOT_FOUND:
+                    raise
+                logger.warning(f"⚠️ {DELETE_SESSION_RPC}() not found in database - falling back to per-table deletes")
+                self._rpc_delete_available = False
+        
+        self.supabase.table("sessions").delete().eq("session_id", session_id).execute()
+        try:
+            self.supabase.table("leads").delete().eq("session_id", session_id).execute()
         except Exception as e:
-            logger.error(f"Error saving Telegram session {session_id} to Supabase: {str(e)}")
-            return False
+            logger.warning(f"⚠️ Could not delete lead data: {e}")
     
     def _is_telegram_session(self, session_id: str) -> bool:
         """Check if session is from Telegram (should be permanent)"""
-        # Telegram sessions typically have specific patterns
-        telegram_patterns = [
-            "telegram_",           # telegram_123456789
-            "tg_",                 # tg_123456789
-            "bot_",                # bot_123456789
-            "chat_",               # chat_123456789
-            "user_"                # user_123456789
-        ]
-        
-        session_lower = session_id.lower()
-        return any(pattern in session_lower for pattern in telegram_patterns)
+        return _is_telegram_session_id(session_id)
     
     def _is_website_session(self, session_id: str) -> bool:
         """Check if session is from website (should be temporary)"""
-        # Website sessions typically have these patterns
-        website_patterns = [
-            "session_",            # session_1234567890
-            "web_",                # web_123456789
-            "widget_",             # widget_123456789
-            "browser_",            # browser_123456789
-            "temp_"                # temp_123456789
-        ]
-        
-        session_lower = session_id.lower()
-        return any(pattern in session_lower for pattern in website_patterns)
+        return _is_website_session_id(session_id)
+    
+    def _sessions_for(self, session_id: str) -> Tuple[Dict[str, UserInfo], threading.Lock]:
+        """Pick the in-memory map that owns this session id, with the lock guarding it"""
+        if _is_telegram_session_id(session_id):
+            return self._tg, self._tg_lock
+        return self._web, self._web_lock
+    
+    def _session_items(self) -> List[Tuple[str, UserInfo]]:
+        """Snapshot every active (session_id, session) pair (Telegram first, then website)"""
+        # Plain reads - monitoring must neither refresh website TTLs nor recreate expired sessions
+        with self._tg_lock:
+            items = list(self._tg.items())
+        with self._web_lock:
+            items.extend(self._web.items())
+        return items
+    
+    def _peek_session(self, session_id: str) -> Optional[UserInfo]:
+        """Cached session without refreshing its TTL, or None"""
+        sessions, lock = self._sessions_for(session_id)
+        with lock:
+            return sessions.get(session_id)
+    
+    def session_count(self) -> int:
+        """Number of active in-memory sessions"""
+        return len(self._tg) + len(self._web)
     
     def _load_session_from_supabase(self, session_id: str) -> Optional[UserInfo]:
         """Load session data from Supabase for persistence - ONLY for Telegram sessions"""
@@ -274,32 +573,11 @@ class SessionMemory:
             
         try:
             # Query Supabase for Telegram session data
-            result = self.supabase.table("sessions").select("*").eq("session_id", session_id).eq("platform", "telegram").execute()
+            result = self.supabase.table("sessions").select(SESSION_COLUMNS).eq("session_id", session_id).eq("platform", "telegram").execute()
             
             if result.data and len(result.data) > 0:
-                session_data = result.data[0]
-                
                 # Create UserInfo object from Supabase data
-                user_info = UserInfo(
-                    email=session_data.get("email"),
-                    phone=session_data.get("phone"),
-                    name=session_data.get("name"),
-                    country=session_data.get("country"),
-                    intake=session_data.get("intake"),
-                    program_level=session_data.get("program_level"),
-                    field_of_study=session_data.get("field_of_study"),
-                    conversation_summary=session_data.get("conversation_summary", ""),
-                    progress_state=session_data.get("progress_state", "conversation_active"),
-                    exchange_count=session_data.get("exchange_count", 0),
-                    completed_steps=json.loads(session_data.get("completed_steps", "[]")),
-                    next_actions=json.loads(session_data.get("next_actions", "[]"))
-                )
-                
-                # Set timestamps if available
-                if session_data.get("created_at"):
-                    user_info.created_at = datetime.fromisoformat(session_data["created_at"])
-                if session_data.get("last_updated"):
-                    user_info.last_updated = datetime.fromisoformat(session_data["last_updated"])
+                user_info = UserInfo.from_record(result.data[0])
                 
                 logger.info(f"Telegram session {session_id} loaded from Supabase successfully")
                 return user_info
@@ -319,29 +597,56 @@ class SessionMemory:
     
     def get_session(self, session_id: str) -> UserInfo:
         """Get or create session for user - handles both temporary and permanent sessions"""
-        if session_id not in self.sessions:
-            # For Telegram sessions: try to load from Supabase first
-            if self._is_telegram_session(session_id):
-                loaded_session = self._load_session_from_supabase(session_id)
-                if loaded_session:
-                    self.sessions[session_id] = loaded_session
-                    logger.info(f"Loaded existing Telegram session from Supabase: {session_id}")
-                else:
-                    self.sessions[session_id] = UserInfo()
-                    logger.info(f"Created new Telegram session: {session_id}")
+        # Single probe on the hot path - only misses fall through to materialization
+        sessions, lock = self._sessions_for(session_id)
+        with lock:
+            session = sessions.get(session_id)
+            if session is not None and sessions is self._web:
+                # Re-inserting restarts the TTL clock, so only idle website sessions expire
+                sessions[session_id] = session
+        if session is not None:
+            return session
+        return self._materialize_session(session_id)
+    
+    def _materialize_session(self, session_id: str) -> UserInfo:
+        """Create or restore a session that is not in the in-memory cache"""
+        # Evicted sessions with an unflushed save are newer than the database copy
+        with self._pending_lock:
+            session = self._pending.get(session_id)
+        if session is None:
+            session = self._create_session(session_id)
+        
+        # Supabase I/O ran unlocked - keep whichever copy another thread cached first
+        sessions, lock = self._sessions_for(session_id)
+        with lock:
+            return sessions.setdefault(session_id, session)
+    
+    def _create_session(self, session_id: str) -> UserInfo:
+        """Load a Telegram session from Supabase, or start a fresh one"""
+        # For Telegram sessions: try to load from Supabase first
+        if self._is_telegram_session(session_id):
+            session = self._load_session_from_supabase(session_id)
+            if session:
+                logger.info(f"Loaded existing Telegram session from Supabase: {session_id}")
             else:
-                # For website sessions: always create new (temporary)
-                self.sessions[session_id] = UserInfo()
-                logger.info(f"Created new website session (temporary): {session_id}")
-        return self.sessions[session_id]
+                session = UserInfo()
+                logger.info(f"Created new Telegram session: {session_id}")
+        else:
+            # For website sessions: always create new (temporary)
+            session = UserInfo()
+            logger.info(f"Created new website session (temporary): {session_id}")
+        
+        return session
     
     def update_session(self, session_id: str, new_info: Dict[str, str]) -> None:
         """Update session with new user information"""
         session = self.get_session(session_id)
-        session.update_info(new_info)
+        if not session.update_info(new_info):
+            logger.info(f"Session {session_id} unchanged - skipping save")
+            return
         
-        # Save to Supabase
-        self._save_session_to_supabase(session_id, session)
+        # Queue for batched Supabase save
+        self._mark_dirty(session_id, session)
         
         logger.info(f"Updated session {session_id} with new info (persisted)")
     
@@ -354,19 +659,14 @@ class SessionMemory:
         # This method is deprecated - LLM now decides when to ask questions based on context
         return False
     
-    def get_conversation_context(self, session_id: str) -> str:
-        """Get conversation context for AI response"""
-        session = self.get_session(session_id)
-        
-        if session.is_complete():
-            return f"User Profile Complete: {session.name} ({session.email}) interested in {session.country} visa for {session.intake} intake."
-        else:
-            missing = session.get_missing_fields()
-            return f"User Profile Incomplete: Missing {', '.join(missing)}. Current info: {session.country or 'Unknown'} country."
-    
     def get_session_summary(self, session_id: str) -> Dict[str, Any]:
         """Get summary of session for debugging/monitoring"""
-        session = self.get_session(session_id)
+        # Peek first so monitoring polls do not keep website sessions alive; only unknown ids load/create
+        session = self._peek_session(session_id) or self.get_session(session_id)
+        return self._summarize(session_id, session)
+    
+    def _summarize(self, session_id: str, session: UserInfo) -> Dict[str, Any]:
+        """Summary dict for one session"""
         return {
             "session_id": session_id,
             "is_complete": session.is_complete(),
@@ -383,8 +683,13 @@ class SessionMemory:
     
     def clear_session(self, session_id: str) -> None:
         """Clear session data (useful for testing)"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        sessions, lock = self._sessions_for(session_id)
+        with lock:
+            sessions.pop(session_id, None)
+        
+        # A queued save would otherwise bring the cleared session back (get_session restores from _pending)
+        if self._is_telegram_session(session_id):
+            self._discard_pending(session_id)
             
         # Also delete from Supabase
         self._delete_session_from_supabase(session_id)
@@ -394,23 +699,19 @@ class SessionMemory:
     def clear_session_data(self, session_id: str) -> None:
         """Force clear session data and refresh from database (for Telegram memory sync)"""
         # Remove from memory
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        sessions, lock = self._sessions_for(session_id)
+        with lock:
+            removed = sessions.pop(session_id, None)
+        if removed is not None:
             logger.info(f"🗑️ Session {session_id} removed from memory")
         
         # Force delete from Supabase database
         if self.supabase and self._is_telegram_session(session_id):
+            self._discard_pending(session_id)
             try:
-                # Delete from sessions table
-                result = self.supabase.table("sessions").delete().eq("session_id", session_id).execute()
-                logger.info(f"🗑️ Session {session_id} deleted from Supabase database")
-                
-                # Also delete from leads table if exists
-                try:
-                    lead_result = self.supabase.table("leads").delete().eq("session_id", session_id).execute()
-                    logger.info(f"🗑️ Lead data for session {session_id} deleted from Supabase")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not delete lead data: {e}")
+                # Delete from sessions and leads tables
+                self._delete_session_rows(session_id)
+                logger.info(f"🗑️ Session {session_id} and its lead data deleted from Supabase database")
                     
             except Exception as e:
                 logger.error(f"❌ Failed to delete session {session_id} from Supabase: {e}")
@@ -424,23 +725,19 @@ class SessionMemory:
         logger.info(f"☢️ NUCLEAR RESET initiated for session {session_id}")
         
         # 1. Remove from memory completely
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        sessions, lock = self._sessions_for(session_id)
+        with lock:
+            removed = sessions.pop(session_id, None)
+        if removed is not None:
             logger.info(f"☢️ Session {session_id} removed from memory")
         
         # 2. Force delete from ALL database tables
         if self.supabase and self._is_telegram_session(session_id):
+            self._discard_pending(session_id)
             try:
-                # Delete from sessions table
-                result = self.supabase.table("sessions").delete().eq("session_id", session_id).execute()
-                logger.info(f"☢️ Session {session_id} deleted from sessions table")
-                
-                # Delete from leads table
-                try:
-                    lead_result = self.supabase.table("leads").delete().eq("session_id", session_id).execute()
-                    logger.info(f"☢️ Lead data for session {session_id} deleted from leads table")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not delete lead data: {e}")
+                # Delete from sessions and leads tables
+                self._delete_session_rows(session_id)
+                logger.info(f"☢️ Session {session_id} deleted from sessions and leads tables")
                 
                 # Delete from any other tables that might exist
                 try:
@@ -458,7 +755,9 @@ class SessionMemory:
                 logger.error(f"❌ Failed to delete session {session_id} from database: {e}")
         
         # 3. Force create a completely fresh session
-        self.sessions[session_id] = UserInfo()
+        fresh = UserInfo()
+        with lock:
+            sessions[session_id] = fresh
         logger.info(f"☢️ Fresh UserInfo created for session {session_id}")
         
         logger.info(f"☢️ NUCLEAR RESET COMPLETE for session {session_id} - completely fresh start")
@@ -473,39 +772,26 @@ class SessionMemory:
             logger.warning(f"Cannot refresh session {session_id} - Supabase not available")
             return
             
+        # Persist queued saves first so the reload sees the latest state
+        self._flush_dirty()
+        
         try:
             # Remove from memory to force fresh load
-            if session_id in self.sessions:
-                del self.sessions[session_id]
+            with self._tg_lock:
+                removed = self._tg.pop(session_id, None)
+            if removed is not None:
                 logger.info(f"🔄 Session {session_id} removed from memory for refresh")
             
             # Force load from database
-            result = self.supabase.table("sessions").select("*").eq("session_id", session_id).execute()
+            result = self.supabase.table("sessions").select(SESSION_COLUMNS).eq("session_id", session_id).execute()
             
             if result.data and len(result.data) > 0:
-                session_data = result.data[0]
                 # Create new UserInfo from database
-                user_info = UserInfo(
-                    email=session_data.get('email'),
-                    phone=session_data.get('phone'),
-                    name=session_data.get('name'),
-                    country=session_data.get('country'),
-                    intake=session_data.get('intake'),
-                    program_level=session_data.get('program_level'),
-                    field_of_study=session_data.get('field_of_study'),
-                    conversation_summary=session_data.get('conversation_summary', ''),
-                    progress_state=session_data.get('progress_state', 'conversation_active'),
-                    exchange_count=session_data.get('exchange_count', 0)
-                )
-                
-                # Set timestamps
-                if session_data.get('created_at'):
-                    user_info.created_at = datetime.fromisoformat(session_data['created_at'])
-                if session_data.get('last_updated'):
-                    user_info.last_updated = datetime.fromisoformat(session_data['last_updated'])
+                user_info = UserInfo.from_record(result.data[0])
                 
                 # Store in memory
-                self.sessions[session_id] = user_info
+                with self._tg_lock:
+                    self._tg[session_id] = user_info
                 logger.info(f"✅ Session {session_id} refreshed from database successfully")
             else:
                 logger.info(f"ℹ️ Session {session_id} not found in database - will be created fresh")
@@ -513,14 +799,18 @@ class SessionMemory:
         except Exception as e:
             logger.error(f"❌ Failed to refresh session {session_id} from database: {e}")
             # Create fresh session on error
-            self.sessions[session_id] = UserInfo()
+            fresh = UserInfo()
+            with self._tg_lock:
+                self._tg[session_id] = fresh
             logger.info(f"🆕 Created fresh session {session_id} due to refresh error")
     
-    def get_all_sessions(self) -> Dict[str, Dict[str, Any]]:
-        """Get summary of all active sessions"""
+    def get_all_sessions(self, page: int = 0, size: int = 100) -> Dict[str, Dict[str, Any]]:
+        """Get summary of one page of active sessions"""
+        # Summarize the snapshotted sessions themselves - no get_session, so no TTL refresh or re-creation
+        items = self._session_items()[page * size:(page + 1) * size]
         return {
-            session_id: self.get_session_summary(session_id)
-            for session_id in self.sessions
+            session_id: self._summarize(session_id, session)
+            for session_id, session in items
         }
 
     def add_conversation_exchange(self, session_id: str, user_input: str, bot_response: str) -> None:
@@ -528,8 +818,8 @@ class SessionMemory:
         session = self.get_session(session_id)
         session.add_conversation_exchange(user_input, bot_response)
         
-        # Save to Supabase
-        self._save_session_to_supabase(session_id, session)
+        # Queue for batched Supabase save
+        self._mark_dirty(session_id, session)
         
         logger.info(f"Added conversation exchange to session {session_id} (persisted)")
     
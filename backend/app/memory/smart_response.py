@@ -13,38 +13,161 @@ Features:
 - FULL context loading for better LLM responses (session memory + conversation history)
 """
 
+import asyncio
+import atexit
 import logging
+import concurrent.futures
+import threading
+import time
+import traceback
+import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import re
+from app.config import settings
 from app.memory.session_memory import get_session_memory
+from app.prompts import get_prompt_orchestrator
 from app.tools.lead_capture_tool import LeadCaptureTool
 
+# Try to import cachetools for the response cache
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Replies to opening messages carry no session context, so identical openers can share one
+RESPONSE_CACHE_MAX = 512
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+# Per-session lead lookups - leads change rarely, and every save invalidates its session
+LEADS_CACHE_MAX = 10_000
+LEADS_CACHE_TTL_SECONDS = 60
+
+# Lead columns shown to the LLM (session_id is implied - rows are already per session)
+LEAD_TABLE_FIELDS = ('id', 'email', 'name', 'phone', 'target_country', 'intake', 'study_level', 'program', 'status', 'created_at')
+
+# Prompt section for a session that already has a lead - filled with the lead's values (N/A when missing)
+_EXISTING_LEAD_FIELDS = ('email', 'name', 'phone', 'target_country', 'intake', 'study_level', 'program', 'status')
+_EXISTING_LEAD_TMPL = """
+EXISTING LEAD DATA (DO NOT ASK FOR THIS INFORMATION AGAIN):
+- Email: {email}
+- Name: {name}
+- Phone: {phone}
+- Target Country: {target_country}
+- Intake: {intake}
+- Study Level: {study_level}
+- Program: {program}
+- Status: {status}
+
+IMPORTANT: User has already provided this information. DO NOT ask for it again.
+Focus on providing helpful visa information and guidance instead.
+"""
+
+# Fixed lead-table sections - reused as-is instead of rebuilt per prompt
+_NO_LEAD_FOOTER = "\nLEAD TABLE DATA: User not yet identified (no email/phone)\n"
+_NO_SESSION_LEADS_FOOTER = "\nLEAD TABLE DATA: No leads found for current session\n"
+_LEAD_ERR_FOOTER = "\nLEAD TABLE DATA: Error retrieving data\n"
+
+# How long a session remembers which lead values it already saved
+SAVED_LEAD_TTL_SECONDS = 3600
+
+# Debounced lead saves: info from a burst of messages is merged per session and written once
+LEAD_FLUSH_INTERVAL_SECONDS = 2.0
+
+# Fallback extraction patterns - compiled once instead of per message
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_RE = re.compile(r'\b\d{10,15}\b')
+_NAME_TRIGGERS = ('my name is', 'i am', "i'm", 'call me', 'this is')  # substring pre-check for _NAME_RE
+_NAME_RE = re.compile(r'\b(?:my name is|i am|i\'m|call me|this is)\s+([a-zA-Z\s]+?)(?:\s*[,.]|$)', re.IGNORECASE)
+# One pass over the message - the matching group name is the country key.
+# When several countries are named the old if/elif order still wins (_COUNTRY_PRIORITY), not the leftmost
+_COUNTRY_PRIORITY = ('usa', 'uk', 'australia', 'south_korea')
+_COUNTRY_RE = re.compile(
+    r'\b(?:(?P<usa>usa|us|united states|america)'
+    r'|(?P<uk>uk|united kingdom|britain|england)'
+    r'|(?P<australia>australia|australian|aussie)'
+    r'|(?P<south_korea>south korea|korea|korean))\b'
+)
+# Words that hint at study-level / intake / program info - with _COUNTRY_RE, '@', digits and the
+# name triggers this gates the extraction LLM call in _detect_and_save_lead's fallback path.
+# Any single field creates a lead, so the program words cover at least what _extract_contact_info_basic knows
+_STUDY_HINTS = (
+    'bachelor', 'master', 'phd', 'diploma', 'degree', 'intake', 'fall', 'spring', 'summer', 'winter',
+    'program', 'course', 'major', 'study', 'studies', 'business', 'computer', 'engineering',
+    'information technology', 'science', 'mba', 'management', 'nursing', 'medicine', 'accounting', 'finance'
+)
+_IT_WORD_RE = re.compile(r'\bit\b')  # "IT" as a program - whole word only, still cheap
+# Common words that are NOT names (see _is_valid_name)
+_INVALID_NAME_WORDS = frozenset({
+    'can', 'you', 'would', 'like', 'which', 'visas', 'need', 'ielts', 'okay', 'whats',
+    'information', 'my', 'name', 'are', 'thank', 'the', 'and', 'or', 'but', 'in', 'on',
+    'at', 'to', 'for', 'of', 'with', 'by', 'from', 'up', 'down', 'out', 'off', 'over',
+    'under', 'above', 'below', 'between', 'among', 'through', 'during', 'before', 'after',
+    'while', 'when', 'where', 'why', 'how', 'what', 'who', 'whom', 'whose', 'this', 'that',
+    'these', 'those', 'is', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
+    'do', 'does', 'did', 'will', 'could', 'should', 'may', 'might', 'must', 'shall'
+})
+_NAME_SPECIAL_CHARS_RE = re.compile(r'[0-9!@#$%^&*()_+\-=\[\]{};\':"\\|,.<>\/?]')
+
 class SmartResponse:
     """AI Consultancy chatbot with lead capture and database saving"""
     
+    __slots__ = ('logger', 'session_memory', 'prompt_orchestrator', 'llm_model', '_lead_capture_tool', '_lead_capture_lock',
+                 '_response_cache', '_response_cache_lock', '_leads_cache', '_leads_cache_lock', '_saved_lead_info',
+                 '_lead_upsert_available', '_pending_leads', '_pending_leads_lock', '_lead_flusher')
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.session_memory = get_session_memory()
+        self.prompt_orchestrator = get_prompt_orchestrator()
         self.llm_model = None
         
-        # Initialize lead capture tool with proper configuration
-        from app.config import settings
-        config = {
-            "supabase_url": settings.SUPABASE_URL,
-            "supabase_service_role_key": settings.SUPABASE_SERVICE_ROLE_KEY,
-            "smtp_server": settings.SMTP_SERVER,
-            "smtp_port": settings.SMTP_PORT,
-            "smtp_username": settings.SMTP_USERNAME,
-            "smtp_password": settings.SMTP_PASSWORD,
-            "from_email": settings.FROM_EMAIL,
-            "from_name": settings.FROM_NAME,
-            "lead_notification_email": settings.LEAD_NOTIFICATION_EMAIL,
-            "enable_email_notifications": settings.ENABLE_EMAIL_NOTIFICATIONS
-        }
-        self.lead_capture_tool = LeadCaptureTool(config)
+        # Built on first lead operation (see lead_capture_tool) - keeps Supabase/SMTP setup off startup
+        self._lead_capture_tool: Optional[LeadCaptureTool] = None
+        self._lead_capture_lock = threading.Lock()  # background lead threads may race the first build
+        
+        # Opening-message reply cache (see _response_cache_key) - disabled without cachetools
+        self._response_cache = TTLCache(maxsize=RESPONSE_CACHE_MAX, ttl=RESPONSE_CACHE_TTL_SECONDS) if CACHETOOLS_AVAILABLE else None
+        self._response_cache_lock = threading.Lock()
+        
+        # get_leads_by_session results by session_id (see _fetch_session_leads) - disabled without cachetools
+        self._leads_cache = TTLCache(maxsize=LEADS_CACHE_MAX, ttl=LEADS_CACHE_TTL_SECONDS) if CACHETOOLS_AVAILABLE else None
+        self._leads_cache_lock = threading.Lock()
+        
+        # Values already written to each session's lead - repeats skip the save entirely
+        self._saved_lead_info = TTLCache(maxsize=LEADS_CACHE_MAX, ttl=SAVED_LEAD_TTL_SECONDS) if CACHETOOLS_AVAILABLE else {}
+        self._lead_upsert_available = True  # flipped off once the leads table reports no unique session_id index
+        
+        # Lead info waiting to be saved, merged per session_id (see _queue_lead)
+        self._pending_leads: Dict[str, Dict[str, str]] = {}
+        self._pending_leads_lock = threading.Lock()
+        self._lead_flusher: Optional[threading.Thread] = None
+        atexit.register(self._flush_pending_leads)
+    
+    @property
+    def lead_capture_tool(self) -> LeadCaptureTool:
+        """Lead capture tool, configured from settings on first use"""
+        if self._lead_capture_tool is None:
+            with self._lead_capture_lock:
+                if self._lead_capture_tool is None:
+                    config = {
+                        "supabase_url": settings.SUPABASE_URL,
+                        "supabase_service_role_key": settings.SUPABASE_SERVICE_ROLE_KEY,
+                        "smtp_server": settings.SMTP_SERVER,
+                        "smtp_port": settings.SMTP_PORT,
+                        "smtp_username": settings.SMTP_USERNAME,
+                        "smtp_password": settings.SMTP_PASSWORD,
+                        "from_email": settings.FROM_EMAIL,
+                        "from_name": settings.FROM_NAME,
+                        "lead_notification_email": settings.LEAD_NOTIFICATION_EMAIL,
+                        "enable_email_notifications": settings.ENABLE_EMAIL_NOTIFICATIONS
+                    }
+                    self._lead_capture_tool = LeadCaptureTool(config)
+                    logger.info("✅ Lead capture tool initialized")
+        return self._lead_capture_tool
         
     def set_llm_model(self, llm_model):
         """Set the LLM model for responses"""
@@ -54,7 +177,17 @@ class SmartResponse:
         except Exception as e:
             logger.error(f"Failed to set LLM model: {e}")
             self.llm_model = None
-    
+
+    def _response_text(self, response) -> Optional[str]:
+        """Read the text of an LLM response once (None if it has no text parts)"""
+        if not response:
+            return None
+        try:
+            # .text joins all candidate parts on every access and raises for function-call-only responses
+            return response.text
+        except (AttributeError, ValueError):
+            return None
+
     def generate_smart_response(self, user_message: str, session_id: str, conversation_history: List[Dict]) -> Dict[str, Any]:
         """Generate response and handle lead capture using PARALLEL 2-LLM processing + BACKGROUND DB operations"""
         try:
@@ -66,7 +199,6 @@ class SmartResponse:
                 }
             
             # ✅ PARALLEL PROCESSING: Run both LLM calls simultaneously
-            import concurrent.futures
             
             # Create a thread pool for parallel LLM calls
             with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
@@ -74,6 +206,8 @@ class SmartResponse:
                 contact_extraction_future = executor.submit(
                     self._extract_contact_info_parallel, user_message
                 )
+                # The prompt's lead lookup overlaps the extraction LLM call instead of following it
+                leads_future = executor.submit(self._fetch_session_leads, session_id)
                 
                 # Wait for contact extraction to complete first
                 contact_info = contact_extraction_future.result()
@@ -82,20 +216,20 @@ class SmartResponse:
                 # This ensures LLM gets fresh, updated data
                 if contact_info:
                     self._update_session_memory_with_contact_info(session_id, contact_info)
-                    logger.info(f"🔍 Session memory updated BEFORE LLM call with: {contact_info}")
+                    logger.debug("🔍 Session memory updated BEFORE LLM call with: %s", contact_info)
                 
                 # Now generate response with updated session data
                 response_generation_future = executor.submit(
-                    self._generate_response_parallel, user_message, session_id, conversation_history
+                    self._generate_response_parallel, user_message, session_id, conversation_history,
+                    leads_future.result()
                 )
                 ai_response = response_generation_future.result()
             
             logger.info(f"🔍 PARALLEL PROCESSING COMPLETE: Contact info extracted, response generated")
-            logger.info(f"🔍 Contact info extracted: {contact_info}")
+            logger.debug("🔍 Contact info extracted: %s", contact_info)
             
             # ✅ BACKGROUND DATABASE OPERATIONS: Only lead saving and conversation tracking in background
             # Session memory is already updated above, so LLM had fresh data
-            import threading
             background_thread = threading.Thread(
                 target=self._background_database_operations_optimized,
                 args=(session_id, contact_info, user_message, ai_response),
@@ -122,6 +256,10 @@ class SmartResponse:
                 "error": str(e)
             }
 
+    async def agenerate_smart_response(self, user_message: str, session_id: str, conversation_history: List[Dict]) -> Dict[str, Any]:
+        """Async entry point - runs the blocking LLM/Supabase pipeline on a worker thread so the event loop keeps serving"""
+        return await asyncio.to_thread(self.generate_smart_response, user_message, session_id, conversation_history)
+    
     def _background_database_operations(self, session_id: str, contact_info: Dict[str, str], user_message: str, ai_response: str):
         """Run database operations in the background without blocking the response"""
         try:
@@ -139,7 +277,7 @@ class SmartResponse:
             # 3. Detect and save lead (this includes database operations)
             lead_saved = self._detect_and_save_lead(user_message, session_id, contact_info)
             if lead_saved:
-                logger.info(f"✅ Background: Lead saved/updated successfully")
+                logger.info(f"✅ Background: Lead queued for saving")
             else:
                 logger.info(f"ℹ️ Background: No lead action needed")
             
@@ -147,7 +285,6 @@ class SmartResponse:
             
         except Exception as e:
             logger.error(f"❌ Background database operations failed: {e}")
-            import traceback
             logger.error(f"❌ Background operations traceback: {traceback.format_exc()}")
     
     def _background_database_operations_optimized(self, session_id: str, contact_info: Dict[str, str], user_message: str, ai_response: str):
@@ -164,7 +301,7 @@ class SmartResponse:
             # 2. Detect and save lead (this includes database operations)
             lead_saved = self._detect_and_save_lead(user_message, session_id, contact_info)
             if lead_saved:
-                logger.info(f"✅ Background: Lead saved/updated successfully")
+                logger.info(f"✅ Background: Lead queued for saving")
             else:
                 logger.info(f"ℹ️ Background: No lead action needed")
             
@@ -172,7 +309,6 @@ class SmartResponse:
             
         except Exception as e:
             logger.error(f"❌ Optimized background database operations failed: {e}")
-            import traceback
             logger.error(f"❌ Background operations traceback: {traceback.format_exc()}")
 
     def _update_session_memory_with_contact_info(self, session_id: str, contact_info: Dict[str, str]):
@@ -196,7 +332,7 @@ class SmartResponse:
                 update_data['field_of_study'] = contact_info['program']  # ✅ Correct: Map to session memory field
             
             if update_data:
-                logger.info(f"🔍 Updating session memory with: {update_data}")
+                logger.debug("🔍 Updating session memory with: %s", update_data)
                 self.session_memory.update_session(session_id, update_data)
             
         except Exception as e:
@@ -230,14 +366,14 @@ class SmartResponse:
             }
             
             # Log what we're creating
-            logger.info(f"🔍 LEAD DATA TO BE CREATED: {lead_data}")
-            logger.info(f"🔍 INFO EXTRACTED: {contact_info}")
+            logger.debug("🔍 LEAD DATA TO BE CREATED: %s", lead_data)
+            logger.debug("🔍 INFO EXTRACTED: %s", contact_info)
             
             # Save to database
             result = self.lead_capture_tool.create_lead(lead_data)
             
             if result.get('success'):
-                logger.info(f"✅ New lead created successfully: {lead_data}")
+                logger.info(f"✅ New lead created successfully for session {session_id}")
                 return True
             else:
                 logger.error(f"❌ Failed to create new lead: {result.get('error')}")
@@ -256,37 +392,37 @@ class SmartResponse:
             # Update name if we have one
             if contact_info.get('name'):
                 update_data['name'] = contact_info['name']
-                logger.info(f"🔍 Updating name to: {contact_info['name']}")
+                logger.debug("🔍 Updating name to: %s", contact_info['name'])
             
             # Update email if we have one
             if contact_info.get('email'):
                 update_data['email'] = contact_info['email']
-                logger.info(f"🔍 Updating email to: {contact_info['email']}")
+                logger.debug("🔍 Updating email to: %s", contact_info['email'])
             
             # Update phone if we have one
             if contact_info.get('phone'):
                 update_data['phone'] = contact_info['phone']
-                logger.info(f"🔍 Updating phone to: {contact_info['phone']}")
+                logger.debug("🔍 Updating phone to: %s", contact_info['phone'])
             
             # Update country if we have one
             if contact_info.get('country'):
                 update_data['target_country'] = contact_info['country']
-                logger.info(f"🔍 Updating country to: {contact_info['country']}")
+                logger.debug("🔍 Updating country to: %s", contact_info['country'])
             
             # Update intake if we have one
             if contact_info.get('intake'):
                 update_data['intake'] = contact_info['intake']
-                logger.info(f"🔍 Updating intake to: {contact_info['intake']}")
+                logger.debug("🔍 Updating intake to: %s", contact_info['intake'])
             
             # Update study level if we have one
             if contact_info.get('study_level'):
                 update_data['study_level'] = contact_info['study_level']
-                logger.info(f"🔍 Updating study_level to: {contact_info['study_level']}")
+                logger.debug("🔍 Updating study_level to: %s", contact_info['study_level'])
             
             # Update program if we have one
             if contact_info.get('program'):
                 update_data['program'] = contact_info['program']
-                logger.info(f"🔍 Updating program to: {contact_info['program']}")
+                logger.debug("🔍 Updating program to: %s", contact_info['program'])
             
             if not update_data:
                 logger.info("🔍 No new information to update in existing lead")
@@ -295,13 +431,13 @@ class SmartResponse:
             # Add timestamp
             update_data['updated_at'] = datetime.now().isoformat()
             
-            logger.info(f"🔍 Updating lead with: {update_data}")
+            logger.debug("🔍 Updating lead with: %s", update_data)
             
             # Update the lead
             result = self.lead_capture_tool.update_lead(existing_lead['id'], update_data)
             
             if result.get('success'):
-                logger.info(f"✅ Lead updated successfully: {update_data}")
+                logger.info(f"✅ Lead {existing_lead['id']} updated successfully")
                 return True
             else:
                 logger.error(f"❌ Failed to update lead: {result.get('error')}")
@@ -314,16 +450,19 @@ class SmartResponse:
     # ❌ REMOVED: Auto-close session methods (only frontend-triggered)
     
     def _detect_and_save_lead(self, user_message: str, session_id: str, contact_info: Dict[str, str] = None) -> bool:
-        """Detect if user provided ANY info and save/update lead - ONE PER SESSION, AUTO-UPDATE"""
+        """Detect if user provided ANY info and queue a lead save/update - ONE PER SESSION, AUTO-UPDATE"""
         try:
-            logger.info(f"🔍 Lead detection started for message: '{user_message[:100]}...'")
+            logger.debug("🔍 Lead detection started for message: '%.100s...'", user_message)
             
             # Use provided contact_info if available, otherwise extract (fallback)
             if contact_info is None:
+                if not self._might_contain_lead_info(user_message):
+                    logger.info("🔍 No information found, skipping lead creation/update")
+                    return False
                 contact_info = self._extract_contact_info(user_message)
-                logger.info(f"🔍 Info extracted (fallback): {contact_info}")
+                logger.debug("🔍 Info extracted (fallback): %s", contact_info)
             else:
-                logger.info(f"🔍 Using provided contact info: {contact_info}")
+                logger.debug("🔍 Using provided contact info: %s", contact_info)
             
             # ✅ NEW LOGIC: Save if ANY info is provided (not just contact info)
             has_any_info = any([
@@ -340,34 +479,146 @@ class SmartResponse:
                 logger.info("🔍 No information found, skipping lead creation/update")
                 return False
             
-            logger.info(f"🔍 Information found - proceeding with lead management")
-            
-            # Get session info for additional details
-            session_info = self.session_memory.get_user_info(session_id)
-            logger.info(f"🔍 Session info: {session_info}")
+            # Same values as the last save for this session (e.g. email repeated) - nothing to write
+            new_info = {key: value for key, value in contact_info.items() if value}
+            with self._pending_leads_lock:
+                saved = self._saved_lead_info.get(session_id)
+                already_saved = saved is not None and all(saved.get(key) == value for key, value in new_info.items())
+            if already_saved:
+                logger.info(f"🔍 Lead info already saved for session {session_id} - skipping")
+                return True
             
-            # Check if lead already exists for this session
-            existing_lead = self._get_existing_lead(session_id)
+            logger.info(f"🔍 Information found - proceeding with lead management")
             
-            if existing_lead:
-                logger.info(f"🔍 Updating existing lead for session {session_id}")
-                logger.info(f"🔍 Existing lead data: {existing_lead}")
-                # Update existing lead with new information
-                return self._update_existing_lead_simple(existing_lead, contact_info, session_info)
-            else:
-                logger.info(f"🔍 Creating new lead for session {session_id} - FIRST TIME with info")
-                # Create new lead with ANY information
-                return self._create_new_lead_simple(contact_info, session_info, session_id)
+            # Queue for the debounced lead flush
+            self._queue_lead(session_id, new_info)
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Error in lead detection and saving: {e}")
-            import traceback
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             return False
     
+    def _might_contain_lead_info(self, message: str) -> bool:
+        """Near-free pre-check - False means the message cannot carry lead info, so extraction is skipped"""
+        if '@' in message or any(ch.isdigit() for ch in message):
+            return True
+        message_lower = message.lower()
+        return (
+            any(trigger in message_lower for trigger in _NAME_TRIGGERS)
+            or any(hint in message_lower for hint in _STUDY_HINTS)
+            or _IT_WORD_RE.search(message_lower) is not None
+            or _COUNTRY_RE.search(message_lower) is not None
+        )
+    
+    def _queue_lead(self, session_id: str, contact_info: Dict[str, str]) -> None:
+        """Merge extracted (non-empty) info into the session's pending lead - newer values win"""
+        with self._pending_leads_lock:
+            self._pending_leads.setdefault(session_id, {}).update(contact_info)
+            if self._lead_flusher is None:
+                self._lead_flusher = threading.Thread(target=self._lead_flush_loop, name="lead-flusher", daemon=True)
+                self._lead_flusher.start()
+    
+    def _lead_flush_loop(self) -> None:
+        """Background worker: save pending leads every LEAD_FLUSH_INTERVAL_SECONDS"""
+        while True:
+            time.sleep(LEAD_FLUSH_INTERVAL_SECONDS)
+            self._flush_pending_leads()
+    
+    def _flush_pending_leads(self) -> None:
+        """Save every pending lead - one lookup and one write per session"""
+        with self._pending_leads_lock:
+            if not self._pending_leads:
+                return
+            pending, self._pending_leads = self._pending_leads, {}
+        
+        for session_id, contact_info in pending.items():
+            try:
+                self._save_lead(session_id, contact_info)
+            except Exception as e:
+                logger.error(f"❌ Error saving lead for session {session_id}: {e}")
+    
+    def forget_session_leads(self, session_id: str) -> None:
+        """Drop queued and cached lead data for a session whose leads were deleted"""
+        with self._pending_leads_lock:
+            self._pending_leads.pop(session_id, None)
+            self._saved_lead_info.pop(session_id, None)
+        self._invalidate_leads_cache(session_id)
+    
+    def _invalidate_leads_cache(self, session_id: str) -> None:
+        """Forget the cached lead lookup for a session"""
+        if self._leads_cache is not None:
+            with self._leads_cache_lock:
+                self._leads_cache.pop(session_id, None)
+    
+    def _save_lead(self, session_id: str, contact_info: Dict[str, str]) -> bool:
+        """Create the session's lead, or update it with the merged info"""
+        saved = None
+        if self._lead_upsert_available:
+            # One round-trip instead of lookup + create/update
+            lead_fields = {('target_country' if field == 'country' else field): value for field, value in contact_info.items()}
+            result = self.lead_capture_tool.upsert_lead_by_session(session_id, lead_fields)
+            if result.get('success'):
+                logger.info(f"✅ Lead saved for session {session_id}")
+                saved = True
+            elif result.get('unsupported'):
+                logger.warning("⚠️ leads.session_id has no unique index - falling back to lookup + create/update")
+                self._lead_upsert_available = False
+            else:
+                logger.error(f"❌ Failed to save lead: {result.get('error')}")
+                saved = False
+        
+        if saved is None:
+            saved = self._save_lead_by_lookup(session_id, contact_info)
+        
+        # The lead changed - later prompts must re-read it
+        self._invalidate_leads_cache(session_id)
+        if saved:
+            with self._pending_leads_lock:
+                self._saved_lead_info.setdefault(session_id, {}).update(contact_info)
+        return saved
+    
+    def _save_lead_by_lookup(self, session_id: str, contact_info: Dict[str, str]) -> bool:
+        """Fallback save for databases without the upsert index: look the lead up, then create or update it"""
+        # Get session info for additional details
+        session_info = self.session_memory.get_user_info(session_id)
+        logger.debug("🔍 Session info: %s", session_info)
+        
+        # Check if lead already exists for this session
+        existing_lead = self._get_existing_lead(session_id)
+        
+        if existing_lead:
+            logger.info(f"🔍 Updating existing lead for session {session_id}")
+            logger.debug("🔍 Existing lead data: %s", existing_lead)
+            # Update existing lead with new information
+            return self._update_existing_lead_simple(existing_lead, contact_info, session_info)
+        
+        logger.info(f"🔍 Creating new lead for session {session_id} - FIRST TIME with info")
+        # Create new lead with ANY information
+        return self._create_new_lead_simple(contact_info, session_info, session_id)
+    
+    def _fetch_session_leads(self, session_id: str) -> Dict[str, Any]:
+        """Look up this session's leads once for prompt building - errors come back as an unsuccessful result"""
+        if self._leads_cache is not None:
+            with self._leads_cache_lock:
+                cached = self._leads_cache.get(session_id)
+            if cached is not None:
+                return cached
+        try:
+            leads = self.lead_capture_tool.get_leads_by_session(session_id)
+            # Only successful lookups are cached - errors retry on the next turn
+            if self._leads_cache is not None and leads.get('success'):
+                with self._leads_cache_lock:
+                    self._leads_cache[session_id] = leads
+            return leads
+        except Exception as e:
+            logger.error(f"Error getting leads for session {session_id}: {e}")
+            return {"success": False, "error": str(e)}
+    
     def _get_existing_lead(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Check if a lead already exists for this session"""
         try:
+            # Always a live read - a prompt prefetch racing a create can leave a stale empty entry in the leads cache
             result = self.lead_capture_tool.get_leads_by_session(session_id)
             if result.get('success') and result.get('data'):
                 # Return the first (and should be only) lead for this session
@@ -382,25 +633,8 @@ class SmartResponse:
         if not name or len(name) < 2:
             return False
         
-        # List of common words that are NOT names
-        invalid_words = [
-            'can', 'you', 'would', 'like', 'which', 'visas', 'need', 'ielts', 'okay', 'whats',
-            'information', 'my', 'name', 'are', 'thank', 'the', 'and', 'or', 'but', 'in', 'on',
-            'at', 'to', 'for', 'of', 'with', 'by', 'from', 'up', 'down', 'out', 'off', 'over',
-            'under', 'above', 'below', 'between', 'among', 'through', 'during', 'before', 'after',
-            'while', 'when', 'where', 'why', 'how', 'what', 'who', 'whom', 'whose', 'this', 'that',
-            'these', 'those', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
-            'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'shall'
-        ]
-        
-        name_lower = name.lower().strip()
-        
-        # Check if name contains only invalid words
-        words = name_lower.split()
-        valid_words = [word for word in words if word not in invalid_words and len(word) > 1]
-        
-        # Name is valid if it has at least one valid word AND is not too long
-        if len(valid_words) == 0:
+        # Name is valid if it has at least one word that is not a common non-name word
+        if not any(len(word) > 1 and word not in _INVALID_NAME_WORDS for word in name.lower().split()):
             return False
         
         # Additional validation: name should not be too long (max 50 characters)
@@ -408,7 +642,7 @@ class SmartResponse:
             return False
         
         # Additional validation: name should not contain numbers or special characters
-        if re.search(r'[0-9!@#$%^&*()_+\-=\[\]{};\':"\\|,.<>\/?]', name):
+        if _NAME_SPECIAL_CHARS_RE.search(name):
             return False
         
         return True
@@ -436,7 +670,7 @@ class SmartResponse:
                 logger.warning("❌ No LLM model available for AI extraction, falling back to basic extraction")
                 return self._extract_contact_info_basic(message)
             
-            logger.info(f"🤖 AI EXTRACTION STARTED for message: '{message[:100]}...'")
+            logger.debug("🤖 AI EXTRACTION STARTED for message: '%.100s...'", message)
             
             # Create AI extraction prompt
             extraction_prompt = f"""
@@ -474,12 +708,13 @@ class SmartResponse:
             """
             
             # Use AI to extract information
+            raw_text = None
             try:
                 response = self.llm_model.generate_content(extraction_prompt)
-                if response and hasattr(response, 'text'):
-                    import json
+                raw_text = self._response_text(response)
+                if raw_text:
                     # Clean the response to get just the JSON
-                    response_text = response.text.strip()
+                    response_text = raw_text.strip()
                     # Remove any markdown formatting
                     if response_text.startswith('```json'):
                         response_text = response_text.replace('```json', '').replace('```', '').strip()
@@ -497,7 +732,7 @@ class SmartResponse:
                         else:
                             cleaned_info[key] = None
                     
-                    logger.info(f"🤖 AI EXTRACTION SUCCESS: {cleaned_info}")
+                    logger.debug("🤖 AI EXTRACTION SUCCESS: %s", cleaned_info)
                     return cleaned_info
                     
                 else:
@@ -506,7 +741,7 @@ class SmartResponse:
                     
             except json.JSONDecodeError as e:
                 logger.error(f"❌ AI extraction failed - invalid JSON: {e}")
-                logger.error(f"❌ Raw AI response: {response.text if response else 'No response'}")
+                logger.error(f"❌ Raw AI response: {raw_text or 'No response'}")
                 return self._extract_contact_info_basic(message)
                 
             except Exception as e:
@@ -515,7 +750,6 @@ class SmartResponse:
                 
         except Exception as e:
             logger.error(f"❌ Error in AI extraction: {e}")
-            import traceback
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             return self._extract_contact_info_basic(message)
 
@@ -526,7 +760,7 @@ class SmartResponse:
                 logger.warning("❌ No LLM model available for AI extraction, falling back to basic extraction")
                 return self._extract_contact_info_basic(message)
             
-            logger.info(f"🤖 PARALLEL AI EXTRACTION STARTED for message: '{message[:100]}...'")
+            logger.debug("🤖 PARALLEL AI EXTRACTION STARTED for message: '%.100s...'", message)
             
             # Create AI extraction prompt
             extraction_prompt = f"""
@@ -564,12 +798,13 @@ class SmartResponse:
             """
             
             # Use AI to extract information
+            raw_text = None
             try:
                 response = self.llm_model.generate_content(extraction_prompt)
-                if response and hasattr(response, 'text'):
-                    import json
+                raw_text = self._response_text(response)
+                if raw_text:
                     # Clean the response to get just the JSON
-                    response_text = response.text.strip()
+                    response_text = raw_text.strip()
                     # Remove any markdown formatting
                     if response_text.startswith('```json'):
                         response_text = response_text.replace('```json', '').replace('```', '').strip()
@@ -587,7 +822,7 @@ class SmartResponse:
                         else:
                             cleaned_info[key] = None
                     
-                    logger.info(f"🤖 PARALLEL AI EXTRACTION SUCCESS: {cleaned_info}")
+                    logger.debug("🤖 PARALLEL AI EXTRACTION SUCCESS: %s", cleaned_info)
                     return cleaned_info
                     
                 else:
@@ -596,7 +831,7 @@ class SmartResponse:
                     
             except json.JSONDecodeError as e:
                 logger.error(f"❌ AI extraction failed - invalid JSON: {e}")
-                logger.error(f"❌ Raw AI response: {response.text if response else 'No response'}")
+                logger.error(f"❌ Raw AI response: {raw_text or 'No response'}")
                 return self._extract_contact_info_basic(message)
                 
             except Exception as e:
@@ -605,22 +840,45 @@ class SmartResponse:
                 
         except Exception as e:
             logger.error(f"❌ Error in parallel AI extraction: {e}")
-            import traceback
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             return self._extract_contact_info_basic(message)
 
-    def _generate_response_parallel(self, user_message: str, session_id: str, conversation_history: List[Dict]) -> str:
+    def _response_cache_key(self, user_message: str, session_info: Any, conversation_history: List[Dict],
+                            leads: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Cache key for a reply that depends only on the message - None when the session has any context"""
+        if self._response_cache is None or conversation_history:
+            return None
+        # A saved lead puts EXISTING LEAD DATA in the prompt even when in-memory state is empty
+        # (expired website session, fresh instance) - the reply is no longer generic
+        if leads is None or leads.get('data'):
+            return None
+        if session_info and (session_info.email or session_info.phone or session_info.name or session_info.country
+                             or session_info.intake or session_info.program_level or session_info.field_of_study):
+            return None
+        return " ".join(user_message.lower().split())
+    
+    def _generate_response_parallel(self, user_message: str, session_id: str, conversation_history: List[Dict],
+                                    leads: Optional[Dict[str, Any]] = None) -> str:
         """Generate AI response - PARALLEL VERSION with FULL CONTEXT"""
         try:
-            logger.info(f"🤖 PARALLEL RESPONSE GENERATION STARTED for message: '{user_message[:100]}...'")
+            logger.debug("🤖 PARALLEL RESPONSE GENERATION STARTED for message: '%.100s...'", user_message)
             
             # ✅ ENHANCED: Get FULL context including session memory and conversation history
             # This ensures LLM has complete information for better responses
             session_info = self.session_memory.get_user_info(session_id)
             
+            # Fresh conversations with a repeated opener skip the LLM entirely
+            cache_key = self._response_cache_key(user_message, session_info, conversation_history, leads)
+            if cache_key is not None:
+                with self._response_cache_lock:
+                    cached_response = self._response_cache.get(cache_key)
+                if cached_response:
+                    logger.info(f"⚡ RESPONSE CACHE HIT for session {session_id}")
+                    return cached_response
+            
             # Create response prompt with FULL context (including lead_saved status)
             # We pass lead_saved=False initially since we don't know yet, but LLM gets full context
-            prompt = self._create_response_prompt(user_message, session_id, conversation_history, False)
+            prompt = self._create_response_prompt(user_message, session_id, conversation_history, False, leads, session_info)
             
             logger.info(f"🤖 PARALLEL RESPONSE GENERATION: Full context loaded for session {session_id}")
             logger.info(f"🤖 PARALLEL RESPONSE GENERATION: Session info available: {session_info is not None}")
@@ -629,10 +887,13 @@ class SmartResponse:
             # Get response from LLM with full context
             try:
                 response = self.llm_model.generate_content(prompt)
-                if response and hasattr(response, 'text'):
-                    ai_response = response.text
+                ai_response = self._response_text(response)
+                if ai_response:
                     logger.info(f"🤖 PARALLEL RESPONSE GENERATION SUCCESS: {len(ai_response)} characters")
                     logger.info(f"🤖 PARALLEL RESPONSE GENERATION: Response generated with full context")
+                    if cache_key is not None:
+                        with self._response_cache_lock:
+                            self._response_cache[cache_key] = ai_response
                     return ai_response
                 else:
                     logger.error("❌ AI response generation failed - no response text")
@@ -649,38 +910,31 @@ class SmartResponse:
     def _extract_contact_info_basic(self, message: str) -> Dict[str, str]:
         """Fallback basic extraction if AI fails"""
         try:
-            logger.info(f"🔄 Using basic extraction fallback for message: '{message[:100]}...'")
+            logger.debug("🔄 Using basic extraction fallback for message: '%.100s...'", message)
             contact_info = {}
             message_lower = message.lower()
             
-            # Basic email extraction
-            import re
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            email_match = re.search(email_pattern, message)
-            if email_match:
-                contact_info['email'] = email_match.group()
+            # Basic email extraction (no '@' means no email - skip the regex)
+            if '@' in message:
+                email_match = _EMAIL_RE.search(message)
+                if email_match:
+                    contact_info['email'] = email_match.group()
             
             # Basic phone extraction
-            phone_pattern = r'\b\d{10,15}\b'
-            phone_match = re.search(phone_pattern, message)
+            phone_match = _PHONE_RE.search(message)
             if phone_match:
                 contact_info['phone'] = phone_match.group()
             
-            # Basic name extraction
-            name_pattern = r'\b(?:my name is|i am|i\'m|call me|this is)\s+([a-zA-Z\s]+?)(?:\s*[,.]|$)'
-            name_match = re.search(name_pattern, message_lower, re.IGNORECASE)
-            if name_match:
-                contact_info['name'] = name_match.group(1).strip().title()
+            # Basic name extraction (only when one of the trigger phrases is present)
+            if any(trigger in message_lower for trigger in _NAME_TRIGGERS):
+                name_match = _NAME_RE.search(message_lower)
+                if name_match:
+                    contact_info['name'] = name_match.group(1).strip().title()
             
             # Basic country extraction
-            if 'usa' in message_lower or 'us' in message_lower:
-                contact_info['country'] = 'usa'
-            elif 'uk' in message_lower:
-                contact_info['country'] = 'uk'
-            elif 'australia' in message_lower:
-                contact_info['country'] = 'australia'
-            elif 'korea' in message_lower:
-                contact_info['country'] = 'south_korea'
+            countries = {country_match.lastgroup for country_match in _COUNTRY_RE.finditer(message_lower)}
+            if countries:
+                contact_info['country'] = next(country for country in _COUNTRY_PRIORITY if country in countries)
             
             # Basic study level extraction
             if 'master' in message_lower:
@@ -698,49 +952,40 @@ class SmartResponse:
             elif 'engineering' in message_lower:
                 contact_info['program'] = 'Engineering'
             
-            logger.info(f"🔄 Basic extraction result: {contact_info}")
+            logger.debug("🔄 Basic extraction result: %s", contact_info)
             return contact_info
             
         except Exception as e:
             logger.error(f"❌ Error in basic extraction: {e}")
             return {}
     
-    def _create_response_prompt(self, user_message: str, session_id: str, conversation_history: List[Dict], lead_saved: bool) -> str:
-        """Create response prompt for the chatbot"""
+    def _create_response_prompt(self, user_message: str, session_id: str, conversation_history: List[Dict], lead_saved: bool,
+                                leads: Optional[Dict[str, Any]] = None, session_info: Any = None) -> str:
+        """Create response prompt for the chatbot - `leads` and `session_info` are values the caller already fetched"""
+        # One lead lookup serves both the existing-lead and lead-table sections
+        if leads is None:
+            leads = self._fetch_session_leads(session_id)
         
-        # Get session info for additional details
-        session_info = self.session_memory.get_user_info(session_id)
+        # Get session info for additional details (reuse the caller's lookup when given)
+        if session_info is None:
+            session_info = self.session_memory.get_user_info(session_id)
         session_context = ""
         if session_info:
-            session_context = f"""
-SESSION CONTEXT:
-- Has contact info: {bool(session_info.email or session_info.phone)}
-- Study country: {getattr(session_info, 'country', 'Not specified')}
-- Study level: {getattr(session_info, 'program_level', 'Not specified')}  # ✅ Correct: Use session memory field
-- Intake: {getattr(session_info, 'intake', 'Not specified')}
-- Program: {getattr(session_info, 'field_of_study', 'Not specified')}  # ✅ Correct: Use session memory field
-- Session ID: {session_id}
-"""
+            # One compact line - fewer prompt tokens than a labelled block
+            session_context = (
+                f"\nSESSION CONTEXT: has_contact={bool(session_info.email or session_info.phone)} "
+                f"country={session_info.country} level={session_info.program_level} "
+                f"intake={session_info.intake} program={session_info.field_of_study} sid={session_id}\n"
+            )
         
         # CRITICAL FIX: Get existing lead data for this session
         existing_lead_data = ""
         try:
-            existing_lead = self._get_existing_lead(session_id)
+            existing_lead = leads['data'][0] if leads.get('success') and leads.get('data') else None
             if existing_lead:
-                existing_lead_data = f"""
-EXISTING LEAD DATA (DO NOT ASK FOR THIS INFORMATION AGAIN):
-- Email: {existing_lead.get('email', 'N/A')}
-- Name: {existing_lead.get('name', 'N/A')}
-- Phone: {existing_lead.get('phone', 'N/A')}
-- Target Country: {existing_lead.get('target_country', 'N/A')}
-- Intake: {existing_lead.get('intake', 'N/A')}
-- Study Level: {existing_lead.get('study_level', 'N/A')}
-- Program: {existing_lead.get('program', 'N/A')}
-- Status: {existing_lead.get('status', 'N/A')}
-
-IMPORTANT: User has already provided this information. DO NOT ask for it again.
-Focus on providing helpful visa information and guidance instead.
-"""
+                existing_lead_data = _EXISTING_LEAD_TMPL.format_map(
+                    {field: existing_lead.get(field, 'N/A') for field in _EXISTING_LEAD_FIELDS}
+                )
             else:
                 existing_lead_data = "\nEXISTING LEAD DATA: No lead found for this session yet.\n"
         except Exception as e:
@@ -751,11 +996,10 @@ Focus on providing helpful visa information and guidance instead.
         conversation_context = ""
         if conversation_history:
             recent_messages = conversation_history[-5:]  # Last 5 messages
-            conversation_context = "\nRECENT CONVERSATION (Last 5 exchanges):\n"
-            for i, msg in enumerate(recent_messages, 1):
-                role = msg.get('role', 'user')
-                content = msg.get('content', msg.get('user_message', msg.get('user_input', '')))
-                conversation_context += f"{i}. {role.title()}: {content}\n"
+            # Exchanges are always written by UserInfo.add_conversation_exchange, so keys are canonical
+            conversation_context = "\nRECENT CONVERSATION (Last 5 exchanges):\n" + "".join(
+                f"{i}. User: {msg['user_input']}\n" for i, msg in enumerate(recent_messages, 1)
+            )
         else:
             # CRITICAL: FRESH START - no conversation history
             conversation_context = "\nRECENT CONVERSATION: NONE - This is a completely fresh conversation. User has no previous interaction history.\n"
@@ -763,80 +1007,53 @@ Focus on providing helpful visa information and guidance instead.
         
         # ✅ RESTORED: Lead table data is essential for LLM to see what's already saved
         # This prevents the LLM from asking for information already provided
-        lead_table_data = ""
-        try:
-            if session_info and (session_info.email or session_info.phone):
-                # Get leads for this session/user
-                leads = self.lead_capture_tool.get_leads_by_session(session_id)
-                if leads and leads.get('success') and leads.get('data'):
-                    lead_table_data = "\nLEAD TABLE DATA (Already Saved in Database):\n"
-                    lead_table_data += "=" * 50 + "\n"
-                    for lead in leads['data']:
-                        lead_table_data += f"""
-Lead ID: {lead.get('id', 'N/A')}
-- Email: {lead.get('email', 'N/A')}
-- Name: {lead.get('name', 'N/A')}
-- Phone: {lead.get('phone', 'N/A')}
-- Target Country: {lead.get('target_country', 'N/A')}
-- Intake: {lead.get('intake', 'N/A')}
-- Study Level: {lead.get('study_level', 'N/A')}
-- Program: {lead.get('program', 'N/A')}
-- Status: {lead.get('status', 'N/A')}
-- Created: {lead.get('created_at', 'N/A')}
-- Session ID: {lead.get('session_id', 'N/A')}
-{'-' * 30}
-"""
-                else:
-                    lead_table_data = "\nLEAD TABLE DATA: No leads found for current session\n"
-            else:
-                lead_table_data = "\nLEAD TABLE DATA: User not yet identified (no email/phone)\n"
-        except Exception as e:
-            logger.error(f"Error getting lead table data: {e}")
-            lead_table_data = "\nLEAD TABLE DATA: Error retrieving data\n"
+        # Unidentified users (the common case) get the constant footer without touching the rows
+        if not (session_info and (session_info.email or session_info.phone)):
+            lead_table_data = _NO_LEAD_FOOTER
+        elif not (leads.get('success') and leads.get('data')):
+            lead_table_data = _NO_SESSION_LEADS_FOOTER
+        else:
+            try:
+                # Compact JSON rows - same facts as a decorated table in far fewer tokens
+                rows = [{field: lead.get(field) for field in LEAD_TABLE_FIELDS} for lead in leads['data']]
+                lead_table_data = (
+                    "\nLEAD TABLE DATA (Already Saved in Database): "
+                    + json.dumps(rows, separators=(',', ':'), default=str) + "\n"
+                )
+            except Exception as e:
+                logger.error(f"Error getting lead table data: {e}")
+                lead_table_data = _LEAD_ERR_FOOTER
         
         # Add lead status to prompt
         lead_status = ""
         if lead_saved:
             lead_status = "\nLEAD STATUS: Contact information has been saved and an advisor will contact you soon."
         
-        # Import and use the new prompt orchestrator
-        from app.prompts import get_prompt_orchestrator
-        
-        prompt_orchestrator = get_prompt_orchestrator()
-        
-        # Get user info for prompt
+        # Get user info for prompt (session_info is always a UserInfo - read its slots directly)
         user_info = {}
         if session_info:
             user_info = {
-                'country': getattr(session_info, 'country', ''),
-                'email': getattr(session_info, 'email', ''),
-                'name': getattr(session_info, 'name', ''),
-                'intake': getattr(session_info, 'intake', ''),
-                'phone': getattr(session_info, 'phone', '')
+                'country': session_info.country,
+                'email': session_info.email,
+                'name': session_info.name,
+                'intake': session_info.intake,
+                'phone': session_info.phone
             }
         
         # Create comprehensive prompt using the orchestrator
-        prompt = prompt_orchestrator.create_comprehensive_prompt(
+        prompt = self.prompt_orchestrator.create_comprehensive_prompt(
             user_question=user_message,
             user_info=user_info,
             conversation_history=conversation_history
         )
         
-        # Add enhanced context sections (CLEAN - no duplicates)
-        enhanced_context = f"""
-{existing_lead_data}
-
-{conversation_context}
-
-{session_context}
-
-{lead_table_data}
-
-{lead_status}
-"""
-        
-        # Combine with the main prompt
-        final_prompt = prompt + enhanced_context
+        # Combine the main prompt with the enhanced context sections (CLEAN - no duplicates) in one join
+        final_prompt = "".join((
+            prompt,
+            "\n",
+            "\n\n".join((existing_lead_data, conversation_context, session_context, lead_table_data, lead_status)),
+            "\n"
+        ))
         
         return final_prompt
     
@@ -864,35 +1081,14 @@ def get_smart_response():
     global smart_response
     if smart_response is None:
         try:
-            # Initialize with proper configuration
-            from app.config import settings
-            config = {
-                "supabase_url": settings.SUPABASE_URL,
-                "supabase_service_role_key": settings.SUPABASE_SERVICE_ROLE_KEY,
-                "smtp_server": settings.SMTP_SERVER,
-                "smtp_port": settings.SMTP_PORT,
-                "smtp_username": settings.SMTP_USERNAME,
-                "smtp_password": settings.SMTP_PASSWORD,
-                "from_email": settings.FROM_EMAIL,
-                "from_name": settings.FROM_NAME,
-                "lead_notification_email": settings.LEAD_NOTIFICATION_EMAIL,
-                "enable_email_notifications": settings.ENABLE_EMAIL_NOTIFICATIONS
-            }
-            
-            # Create SmartResponse instance
+            # Create SmartResponse instance - the lead capture tool is built on first use
             smart_response = SmartResponse()
             
-            # Initialize the lead capture tool with proper config
-            from app.tools.lead_capture_tool import LeadCaptureTool
-            smart_response.lead_capture_tool = LeadCaptureTool(config)
-            
             logger.info("✅ SmartResponse instance properly initialized with configuration")
-            logger.info(f"✅ Lead capture tool initialized: {smart_response.lead_capture_tool is not None}")
             logger.info(f"✅ Session memory initialized: {smart_response.session_memory is not None}")
             
         except Exception as e:
             logger.error(f"❌ Error initializing SmartResponse: {e}")
-            import traceback
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             raise
     
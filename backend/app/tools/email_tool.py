@@ -7,8 +7,10 @@ This tool sends:
 - User communications
 """
 
+import atexit
 import logging
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any, Optional, List
@@ -29,6 +31,11 @@ class EmailTool:
         self.from_email = self.config.get("from_email") or settings.FROM_EMAIL
         self.from_name = self.config.get("from_name") or settings.FROM_NAME
         
+        # Long-lived SMTP session reused across notifications (see _get_smtp)
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_lock = threading.Lock()
+        atexit.register(self._close_smtp)
+        
         # Check if email is configured
         self.email_configured = bool(
             self.smtp_server and 
@@ -358,6 +365,44 @@ class EmailTool:
         
         return lead_details
     
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Return a logged-in SMTP session, reconnecting only if the pooled one went stale (caller holds _smtp_lock)"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._drop_smtp()
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=5)
+        try:
+            server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._smtp = server
+        return server
+    
+    def _drop_smtp(self) -> None:
+        """Discard the pooled SMTP session without waiting on the server"""
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            finally:
+                self._smtp = None
+    
+    def _close_smtp(self) -> None:
+        """QUIT the pooled SMTP session at shutdown"""
+        with self._smtp_lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._drop_smtp()
+    
     def _send_email(self, to_email: str, subject: str, body: str, is_html: bool = False) -> Dict[str, Any]:
         """Send email using SMTP"""
         try:
@@ -373,22 +418,22 @@ class EmailTool:
             else:
                 msg.attach(MIMEText(body, 'plain'))
             
-            # Connect to SMTP server with timeout
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=5) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                
-                # Send email
-                text = msg.as_string()
-                server.sendmail(self.from_email, to_email, text)
-                
-                logger.info(f"Email sent successfully to {to_email}")
-                return {
-                    "success": True,
-                    "message": "Email sent successfully",
-                    "to": to_email,
-                    "subject": subject
-                }
+            # Send on the pooled connection - one retry on a fresh one if the server dropped it mid-send
+            text = msg.as_string()
+            with self._smtp_lock:
+                try:
+                    self._get_smtp().sendmail(self.from_email, to_email, text)
+                except smtplib.SMTPServerDisconnected:
+                    self._drop_smtp()
+                    self._get_smtp().sendmail(self.from_email, to_email, text)
+            
+            logger.info(f"Email sent successfully to {to_email}")
+            return {
+                "success": True,
+                "message": "Email sent successfully",
+                "to": to_email,
+                "subject": subject
+            }
                 
         except Exception as e:
             logger.error(f"Failed to send email: {str(e)}")
@@ -7,13 +7,17 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 from dataclasses import dataclass
 import os
-from supabase import create_client, Client
+from supabase import Client
 from pydantic import BaseModel, EmailStr
 from app.config import settings
+from app.utils.supabase_client import create_pooled_client
 from .email_tool import EmailTool
 
 logger = logging.getLogger(__name__)
 
+# Postgres error raised when ON CONFLICT names columns without a unique index
+PG_NO_UNIQUE_CONSTRAINT = "42P10"
+
 @dataclass
 class Lead:
     """Lead data structure"""
@@ -90,7 +94,8 @@ class LeadCaptureTool:
                 self.supabase = None
                 return
             
-            self.supabase = create_client(url, key)
+            # Shares the process-wide keep-alive HTTP/2 pool with session persistence
+            self.supabase = create_pooled_client(url, key)
             logger.info("Supabase client initialized successfully")
             
         except Exception as e:
@@ -240,6 +245,82 @@ class LeadCaptureTool:
                 "fallback_data": update_data
             }
     
+    def upsert_lead_by_session(self, session_id: str, lead_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create or update the session's lead in one round-trip.
+        
+        Only non-empty fields are written, so an update never blanks a saved value.
+        tenant_id is always sent so rows match create_lead's; created_at is left out
+        of the upsert (it would overwrite the original on update) and stamped
+        afterwards only when the row comes back without one, i.e. a fresh insert
+        into a table with no column default.
+        Needs a unique index on leads.session_id - without it the result carries
+        "unsupported": True and callers should fall back to create_lead/update_lead.
+        
+        Args:
+            session_id: Session the lead belongs to
+            lead_data: Lead fields to write
+            
+        Returns:
+            Dictionary with operation result
+        """
+        try:
+            upsert_request = LeadUpdateRequest(**lead_data)
+            
+            lead_record = {field: value for field, value in upsert_request.model_dump(exclude_none=True).items() if value != ""}
+            lead_record["session_id"] = session_id
+            lead_record["tenant_id"] = "default"
+            
+            if self.supabase:
+                result = self.supabase.table(self.table_name).upsert(lead_record, on_conflict="session_id").execute()
+                
+                if result.data:
+                    lead = result.data[0]
+                    lead_id = lead.get("id")
+                    logger.info(f"Lead {lead_id} upserted for session {session_id}")
+                    
+                    if not lead.get("created_at"):
+                        # Fresh insert without a column default - stamp it like create_lead does
+                        created_at = datetime.now(timezone.utc).isoformat()
+                        self.supabase.table(self.table_name).update({"created_at": created_at}).eq("id", lead_id).execute()
+                        lead["created_at"] = created_at
+                    
+                    email_sent = self._check_and_send_email_if_complete(lead)
+                    
+                    return {
+                        "success": True,
+                        "lead_id": lead_id,
+                        "lead_data": lead,
+                        "email_sent": email_sent,
+                        "message": f"Lead saved successfully - email {'sent' if email_sent else 'pending until more details'}"
+                    }
+                else:
+                    logger.error("Failed to upsert lead - no data returned")
+                    return {
+                        "success": False,
+                        "error": "Failed to upsert lead - no data returned",
+                        "fallback_data": lead_record
+                    }
+            else:
+                # Mock mode
+                lead_record["created_at"] = datetime.now(timezone.utc).isoformat()
+                logger.info(f"Mock mode: Lead upserted for session {session_id}")
+                return {
+                    "success": True,
+                    "lead_id": f"mock_session_{session_id}_1",
+                    "lead_data": lead_record,
+                    "message": "Lead saved successfully (mock mode)"
+                }
+                
+        except Exception as e:
+            logger.error(f"Error upserting lead for session {session_id}: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "unsupported": getattr(e, "code", None) == PG_NO_UNIQUE_CONSTRAINT,
+                "fallback_data": lead_data
+            }
+    
     def _check_and_send_email_if_complete(self, lead_data: Dict[str, Any]) -> bool:
         """
         ✅ NEW SMART EMAIL SYSTEM: Check if lead is complete enough to send email.
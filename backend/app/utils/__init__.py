@@ -5,6 +5,7 @@ Provides centralized path management, logging, and common utilities
 
 from .paths import CFG, get_data_file_path, get_index_file_path, get_country_data_path, get_log_file_path, get_config_file_path
 from .logging_config import setup_clean_logging, cleanup_old_logs, get_log_info
+from .supabase_client import create_pooled_client, get_http_client, upsert_rows
 
 __all__ = [
     'CFG',
@@ -15,5 +16,8 @@ __all__ = [
     'get_config_file_path',
     'setup_clean_logging',
     'cleanup_old_logs',
-    'get_log_info'
+    'get_log_info',
+    'create_pooled_client',
+    'get_http_client',
+    'upsert_rows'
 ]
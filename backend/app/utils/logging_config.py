@@ -5,10 +5,24 @@ Clean Logging Configuration with Rotation and Cleanup
 
 import logging
 import logging.handlers
+import atexit
+import queue
 from pathlib import Path
 from datetime import datetime
 import os
 
+# Background listener that drains queued records into the real handlers
+_queue_listener = None
+
+def _stop_queue_listener():
+    """Flush queued records and stop the background logging thread"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+atexit.register(_stop_queue_listener)
+
 def setup_clean_logging(
     log_level: str = "INFO",
     log_dir: Path = None,
@@ -24,6 +38,7 @@ def setup_clean_logging(
         max_size_mb: Maximum log file size in MB before rotation
         backup_count: Number of backup files to keep
     """
+    global _queue_listener
     
     if log_dir is None:
         # Get logs directory from paths
@@ -37,9 +52,11 @@ def setup_clean_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
     
-    # Clear existing handlers
+    # Clear existing handlers (and drain any previous listener)
+    _stop_queue_listener()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    handlers = []
     
     # Create formatters
     detailed_formatter = logging.Formatter(
@@ -56,7 +73,7 @@ def setup_clean_logging(
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(simple_formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # Main application log with rotation
     main_log_file = log_dir / "main_app.log"
@@ -69,7 +86,7 @@ def setup_clean_logging(
     main_handler.setLevel(logging.INFO)
     main_handler.setFormatter(detailed_formatter)
     main_handler.set_name("main_app")
-    root_logger.addHandler(main_handler)
+    handlers.append(main_handler)
     
     # Error log (only errors and important)
     error_log_file = log_dir / "errors.log"
@@ -82,7 +99,7 @@ def setup_clean_logging(
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(detailed_formatter)
     error_handler.set_name("errors")
-    root_logger.addHandler(error_handler)
+    handlers.append(error_handler)
     
     # Debug log (only when debug mode)
     if log_level.upper() == "DEBUG":
@@ -96,7 +113,13 @@ def setup_clean_logging(
         debug_handler.setLevel(logging.DEBUG)
         debug_handler.setFormatter(detailed_formatter)
         debug_handler.set_name("debug")
-        root_logger.addHandler(debug_handler)
+        handlers.append(debug_handler)
+    
+    # Request threads only enqueue records - file/console I/O happens on the listener thread
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
     
     # Log startup message
     logging.info("=" * 60)
@@ -0,0 +1,94 @@
+"""
+Shared Supabase Client Factory
+Builds Supabase clients on a pooled keep-alive HTTP transport
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import orjson
+
+# Try to import Supabase and its HTTP transport
+try:
+    import httpx
+    from supabase import create_client, Client
+    from supabase.lib.client_options import SyncClientOptions
+    SUPABASE_AVAILABLE = True
+except ImportError:
+    SUPABASE_AVAILABLE = False
+    Client = None
+
+logger = logging.getLogger(__name__)
+
+# Connection pool sizing for PostgREST calls
+MAX_KEEPALIVE_CONNECTIONS = 20
+MAX_CONNECTIONS = 50
+KEEPALIVE_EXPIRY_SECONDS = 30
+REQUEST_TIMEOUT_SECONDS = 30
+
+_http_client = None
+
+def get_http_client() -> "httpx.Client":
+    """Get the process-wide keep-alive HTTP client (created on first use)"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=REQUEST_TIMEOUT_SECONDS
+        )
+    return _http_client
+
+def upsert_rows(url: str, key: str, table: str, rows: Union[List[Dict[str, Any]], bytes], on_conflict: str) -> "httpx.Response":
+    """
+    Upsert rows straight through PostgREST on the pooled HTTP/2 client
+
+    The body is encoded with orjson (or sent as-is when the caller passes
+    already-encoded bytes, e.g. to reuse one encoding across retries) and the
+    server is asked not to echo the rows back. Raises httpx.HTTPStatusError on
+    a non-2xx response.
+
+    Args:
+        url: Supabase project URL
+        key: Supabase API key
+        table: Target table name
+        rows: Row dicts to upsert, or their orjson-encoded JSON array
+        on_conflict: Column(s) that identify an existing row
+    """
+    response = get_http_client().post(
+        f"{url}/rest/v1/{table}",
+        params={"on_conflict": on_conflict},
+        content=rows if isinstance(rows, bytes) else orjson.dumps(rows),
+        headers={
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+            "Prefer": "resolution=merge-duplicates,return=minimal"
+        }
+    )
+    response.raise_for_status()
+    return response
+
+def create_pooled_client(url: str, key: str) -> Optional[Client]:
+    """
+    Create a Supabase client that reuses pooled connections
+
+    Args:
+        url: Supabase project URL
+        key: Supabase API key
+    """
+    if not SUPABASE_AVAILABLE:
+        return None
+
+    try:
+        options = SyncClientOptions(httpx_client=get_http_client())
+    except TypeError:
+        # Older supabase releases cannot take an injected HTTP client
+        logger.warning("Supabase client does not accept httpx_client - using default transport")
+        return create_client(url, key)
+
+    return create_client(url, key, options=options)
@@ -204,56 +204,65 @@ class ChatResponse(BaseModel):
     user_info_extracted: Optional[Dict[str, str]] = None
     timestamp: str
 
+# Placeholder names that are never accepted as the user's real name
+_BANNED_NAMES = frozenset({'user', 'test', 'example', 'sample'})
+
+# extract_user_info patterns - compiled once at import instead of per message
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_RE = re.compile(r'\b\d{10,15}\b')
+# One pattern per rule, searched in priority order - a single alternation would let a lazy
+# lower-priority match ("i am interested and my name is ...") swallow a higher-priority trigger
+_NAME_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\bmy name is\s+([A-Za-z\s]+?)(?:\s*[,.]|$)',
+    r'\bi\'m\s+([A-Za-z\s]+?)(?:\s*[,.]|$)',
+    r'\bi am\s+([A-Za-z\s]+?)(?:\s*[,.]|$)',
+    r'\bname\s*:\s*([A-Za-z\s]+?)(?:\s*[,.]|$)',
+    r'\bcall me\s+([A-Za-z\s]+?)(?:\s*[,.]|$)'
+))
+# Country aliases -> canonical country, matched in one pass (longest alias first so
+# "u.s.a" wins over "u.s." and "south korea" over "korea")
+_COUNTRY_ALIASES = {
+    **dict.fromkeys(['usa', 'united states', 'america', 'us', 'u.s.', 'u.s.a'], 'usa'),
+    **dict.fromkeys(['uk', 'united kingdom', 'britain', 'england', 'great britain'], 'uk'),
+    **dict.fromkeys(['australia', 'aussie'], 'australia'),
+    **dict.fromkeys(['south korea', 'korea', 'korean', 'seoul'], 'south_korea')
+}
+_COUNTRY_RE = re.compile(
+    r'(?<!\w)(' + '|'.join(re.escape(alias) for alias in sorted(_COUNTRY_ALIASES, key=len, reverse=True)) + r')(?!\w)'
+)
+# When several countries are named the old dict order still wins, not the leftmost mention
+_COUNTRY_PRIORITY = ('usa', 'uk', 'australia', 'south_korea')
+
 def extract_user_info(message: str) -> Dict[str, str]:
     """Extract user information from message (legacy support)"""
     user_info = {}
     message_lower = message.lower()
     
     # Extract email
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_match = re.search(email_pattern, message)
+    email_match = _EMAIL_RE.search(message)
     if email_match:
         user_info['email'] = email_match.group()
     
     # Extract phone number
-    phone_pattern = r'\b\d{10,15}\b'
-    phone_match = re.search(phone_pattern, message)
+    phone_match = _PHONE_RE.search(message)
     if phone_match:
         user_info['phone'] = phone_match.group()
     
     # Extract name (improved pattern)
-    name_patterns = [
-        r'\bmy name is\s+([A-Za-z\s]+?)(?:\s*[,.]|$)',
-        r'\bi\'m\s+([A-Za-z\s]+?)(?:\s*[,.]|$)',
-        r'\bi am\s+([A-Za-z\s]+?)(?:\s*[,.]|$)',
-        r'\bname\s*:\s*([A-Za-z\s]+?)(?:\s*[,.]|$)',
-        r'\bcall me\s+([A-Za-z\s]+?)(?:\s*[,.]|$)'
-    ]
-    
-    for pattern in name_patterns:
-        name_match = re.search(pattern, message_lower, re.IGNORECASE)
+    for name_re in _NAME_RES:
+        name_match = name_re.search(message_lower)
         if name_match:
             name = name_match.group(1).strip()
-            if name and len(name) > 1 and name not in ['user', 'test', 'example', 'sample']:
+            if name and len(name) > 1 and name not in _BANNED_NAMES:
                 user_info['name'] = name.title()
                 break
     
     # Extract target country with better detection
-    country_patterns = {
-        'usa': ['usa', 'united states', 'america', 'us', 'u.s.', 'u.s.a'],
-        'uk': ['uk', 'united kingdom', 'britain', 'england', 'great britain'],
-        'australia': ['australia', 'aussie'],
-        'south_korea': ['south korea', 'korea', 'korean', 'seoul']
-    }
-    
-    for country, patterns in country_patterns.items():
-        for pattern in patterns:
-            if pattern in message_lower:
-                user_info['country'] = country
-                logger.info(f"Extracted country '{country}' from message")
-                break
-        if 'country' in user_info:
-            break
+    countries = {_COUNTRY_ALIASES[country_match.group(1)] for country_match in _COUNTRY_RE.finditer(message_lower)}
+    if countries:
+        country = next(country for country in _COUNTRY_PRIORITY if country in countries)
+        user_info['country'] = country
+        logger.info(f"Extracted country '{country}' from message")
     
     # Extract intake period
     intake_keywords = ['fall', 'spring', 'summer', 'autumn', 'winter']
@@ -359,7 +368,8 @@ async def chat(request: Request, chat_request: ChatRequest):
                 # Get conversation history
                 logger.info("?? DEBUG: About to get conversation history...")
                 memory = get_session_memory()
-                conversation_context = memory.get_conversation_context(session_id)
+                # Session lookup may hit Supabase on a cold session - keep it off the event loop
+                conversation_context = await asyncio.to_thread(memory.get_conversation_context, session_id)
                 conversation_history = conversation_context.get("conversation_history", [])
                 logger.info(f"Retrieved conversation history: {len(conversation_history)} exchanges")
                 
@@ -373,7 +383,7 @@ async def chat(request: Request, chat_request: ChatRequest):
                     smart_response_instance = get_smart_response()
                     smart_response_instance.set_llm_model(model)
                     logger.info("?? DEBUG: About to call generate_smart_response...")
-                    result = smart_response_instance.generate_smart_response(
+                    result = await smart_response_instance.agenerate_smart_response(
                         chat_request.message, session_id, conversation_history
                     )
                     
@@ -386,7 +396,7 @@ async def chat(request: Request, chat_request: ChatRequest):
                     
                     # Update session memory with extracted info from smart_response
                     if result.get('user_info_extracted'):
-                        memory.update_session(session_id, result.get('user_info_extracted'))
+                        await asyncio.to_thread(memory.update_session, session_id, result.get('user_info_extracted'))
                         logger.info(f"Session updated with enhanced extraction: {result.get('user_info_extracted')}")
                     
                 else:
@@ -396,7 +406,7 @@ async def chat(request: Request, chat_request: ChatRequest):
                 
                 # Track the conversation exchange in session memory
                 try:
-                    memory.add_conversation_exchange(session_id, chat_request.message, ai_response)
+                    await asyncio.to_thread(memory.add_conversation_exchange, session_id, chat_request.message, ai_response)
                     logger.info(f"Conversation exchange tracked for session {session_id}")
                 except Exception as e:
                     logger.warning(f"Failed to track conversation exchange: {e}")
@@ -107,6 +107,7 @@ async def stop_typing_action(chat_id: int) -> None:
 @telegram_router.post("/webhook")
 async def telegram_webhook(request: Request):
     """Handle incoming Telegram webhooks - FOCUSED VERSION with typing + queue"""
+    user_id = None  # Bound up front so the error path never needs locals()
     try:
         # Get the update from Telegram
         update_data = await request.json()
@@ -149,8 +150,12 @@ async def telegram_webhook(request: Request):
                     from app.memory import get_session_memory
                     memory = get_session_memory()
                     
-                    # ACTUALLY DELETE the session data
-                    memory.clear_session_data(session_id)
+                    # ACTUALLY DELETE the session data (blocking Supabase deletes run off the event loop)
+                    await asyncio.to_thread(memory.clear_session_data, session_id)
+                    
+                    # Queued or cached lead data must not outlive the deleted rows
+                    from app.memory.smart_response import get_smart_response
+                    get_smart_response().forget_session_leads(session_id)
                     logger.info(f"🗑️ User {user_id} requested data deletion - session data CLEARED from database")
                     
                     response_text = "✅ Your data has been completely deleted from our system. This is a fresh start - I have no memory of our previous conversation. How can I help you with student visa information?"
@@ -176,7 +181,7 @@ async def telegram_webhook(request: Request):
                 
                 # Get conversation history
                 memory = get_session_memory()
-                conversation_context = memory.get_conversation_context(session_id)
+                conversation_context = await asyncio.to_thread(memory.get_conversation_context, session_id)
                 conversation_history = conversation_context.get("conversation_history", [])
                 
                 # CRITICAL FIX: If this is a fresh conversation (no history), force empty context
@@ -186,7 +191,7 @@ async def telegram_webhook(request: Request):
                 
                 # Generate response
                 smart_response = get_smart_response()
-                result = smart_response.generate_smart_response(
+                result = await smart_response.agenerate_smart_response(
                     user_message=text,
                     session_id=session_id,
                     conversation_history=conversation_history
@@ -196,7 +201,7 @@ async def telegram_webhook(request: Request):
                     ai_response = result.get('response', '')
                     
                     # Save conversation to memory
-                    memory.add_conversation_exchange(session_id, text, ai_response)
+                    await asyncio.to_thread(memory.add_conversation_exchange, session_id, text, ai_response)
                     logger.info(f"💾 Conversation saved to memory for session {session_id}")
                     
                     # STOP TYPING INDICATOR
@@ -244,7 +249,7 @@ async def telegram_webhook(request: Request):
     except Exception as e:
         logger.error(f"❌ Telegram webhook error: {e}")
         # Remove user from processing list on any exception
-        if 'user_id' in locals():
+        if user_id is not None:
             users_being_processed.discard(user_id)
             logger.info(f"✅ User {user_id} removed from processing list due to exception")
         raise HTTPException(status_code=500, detail="Internal server error")